@@ -1,3 +1,5 @@
+import os
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from config import config_dict
@@ -14,10 +16,63 @@ def create_app(config_name="development"):
 
     db.init_app(app)
 
+    from app.utils.contacts import contact_directory
+    from app.utils.alerts import alert_correlator
+    from app.utils.retention import storage_manager
+    from app.utils.database import add_missing_columns, batch_writer, configure_sqlite
+    contact_directory.init_app(app)
+    alert_correlator.init_app(app)
+    storage_manager.init_app(app)
+    batch_writer.init_app(app)
+
     register_blueprints(app)
 
-    # Initialize the database (create tables)
+    @app.cli.command("reembed-targets")
+    @click.option("--import-dir/--no-import-dir", default=True,
+                  help="Import untracked images from TARGET_DIR as targets first.")
+    def reembed_targets_command(import_dir):
+        """Re-embed all targets with the configured recognition engine."""
+        from app.utils.gallery import gallery_store
+        from app.utils.recognition import get_engine, reembed_targets
+        target_dir = app.config['TARGET_DIR'] if import_dir else None
+        reembed_targets(get_engine(app.config), target_dir=target_dir)
+        gallery_store.rebuild(app)
+
+    @app.cli.command("gallery-recall")
+    @click.option("--queries", default=1000, help="Number of noisy probe queries.")
+    @click.option("--noise", default=0.05, help="Gaussian noise added to each probe.")
+    def gallery_recall_command(queries, noise):
+        """Measure recall of the configured compressed gallery against exact search."""
+        import tempfile
+        import numpy as np
+        from app.models import Target
+        from app.utils.gallery import build_gallery, measure_recall
+
+        if not app.config['GALLERY_QUANTIZATION']:
+            click.echo("GALLERY_QUANTIZATION is not set")
+            return
+
+        # build into a scratch file so the live GALLERY_VECTORS_PATH is untouched
+        with tempfile.TemporaryDirectory() as scratch:
+            rows = (db.session.query(Target.target_name, Target.embedding)
+                    .order_by(Target.id)
+                    .yield_per(app.config['GALLERY_BUILD_CHUNK']))
+            gallery = build_gallery(
+                rows, Target.query.count(), app.config,
+                vectors_path=os.path.join(scratch, 'vectors.npy'))
+            if not len(gallery):
+                click.echo("The gallery is empty")
+                return
+
+            rng = np.random.default_rng(0)
+            probes = np.asarray(gallery.vectors[rng.integers(0, len(gallery), queries)])
+            probes = probes + rng.normal(0, noise, probes.shape).astype(np.float32)
+            click.echo(measure_recall(gallery, probes))
+
+    # Initialize the database (tune SQLite, create tables, add new optional columns)
     with app.app_context():
+        configure_sqlite(db.engine, app.config)
         db.create_all()
+        add_missing_columns(db.engine, db.metadata)
 
     return app
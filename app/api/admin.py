@@ -0,0 +1,52 @@
+import logging
+from flask import Blueprint, Response, request, jsonify
+
+from app.api.streams import active_streams
+from app.utils.profiler import DEFAULT_INTERVAL, ProfilerBusy, sample_threads
+
+logger = logging.getLogger(__name__)
+admin_bp = Blueprint('admin', __name__)
+
+MAX_PROFILE_SECONDS = 60
+
+
+@admin_bp.route('/admin/profile', methods=['GET'])
+def profile_streams():
+    """Sample the capture and process threads of running streams.
+
+    ?seconds=N (default 10), ?interval=S (default 0.01), ?stream_id= to
+    limit to one stream, ?format=collapsed for flamegraph input.
+    """
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval', DEFAULT_INTERVAL))
+    except ValueError:
+        return jsonify({'error': "'seconds' and 'interval' must be numbers"}), 400
+
+    if not 0 < seconds <= MAX_PROFILE_SECONDS or not 0.001 <= interval <= 1:
+        return jsonify({
+            'error': f"'seconds' must be in (0, {MAX_PROFILE_SECONDS}], 'interval' in [0.001, 1]"
+        }), 400
+
+    stream_id = request.args.get('stream_id')
+    if stream_id:
+        if stream_id not in active_streams:
+            return jsonify({'error': 'Stream not active'}), 404
+        monitors = [active_streams[stream_id]]
+    else:
+        monitors = list(active_streams.values())
+
+    threads = [t for monitor in monitors for t in monitor.threads() if t.is_alive()]
+    if not threads:
+        return jsonify({'error': 'No running stream threads to profile'}), 404
+
+    try:
+        result = sample_threads(threads, seconds, interval)
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+
+    logger.info(f"Profiled {len(threads)} threads for {result['duration']:.1f}s")
+
+    if request.args.get('format') == 'collapsed':
+        return Response(result['collapsed'] + '\n', mimetype='text/plain')
+    return jsonify(result), 200
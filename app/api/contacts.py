@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from app import db
 from app.models import Contact
-from .utils import validate_input
+from app.utils.contacts import contact_directory
+from .utils import not_modified, paginated_response, parse_pagination, validate_input
 import re
 
 contacts_bp = Blueprint('contacts', __name__)
@@ -44,6 +45,7 @@ def add_contact():
             contact_name=data['contact_name'], contact_email=data['contact_email'], active=True)
         db.session.add(new_contact)
         db.session.commit()
+        contact_directory.invalidate()
 
         return jsonify({'message': 'Contact added!', 'contact': f'{new_contact.to_dict()}'}), 201
 
@@ -53,9 +55,26 @@ def add_contact():
 
 @contacts_bp.route('/contacts', methods=['GET'])
 def get_contacts():
+    after, limit, error = parse_pagination(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    etag, response = not_modified(Contact.__tablename__, after, limit)
+    if response:
+        return response
+
     try:
-        contacts = Contact.query.all()
-        return jsonify([c.to_dict() for c in contacts])
+        rows = (db.session.query(
+                    Contact.id, Contact.contact_name, Contact.contact_email,
+                    Contact.contact_phone, Contact.active)
+                .filter(Contact.id > after)
+                .order_by(Contact.id)
+                .limit(limit)
+                .all())
+
+        return paginated_response(
+            [dict(row._mapping) for row in rows], etag,
+            rows[-1].id if rows else None, limit, 'contacts.get_contacts')
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -81,6 +100,7 @@ def delete_contact(id):
             return jsonify({'error': 'Contact not found'}), 404
         db.session.delete(contact)
         db.session.commit()
+        contact_directory.invalidate()
         return jsonify({'message': 'Contact deleted'}), 200
 
     except Exception as e:
@@ -2,13 +2,14 @@ import uuid
 import datetime
 import threading
 import logging
-import cv2
-from flask import Blueprint, request, jsonify, current_app as app
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, Response, request, jsonify, current_app as app
 from app import db
 from app.models import Stream
 
-from app.api.utils import validate_active_field
+from app.api.utils import validate_active_field, validate_evidence_mode, validate_regions
 from app.stream_monitor import StreamMonitor
+from app.utils.preview import BOUNDARY
 
 logger = logging.getLogger(__name__)
 streams_bp = Blueprint('streams', __name__)
@@ -16,6 +17,51 @@ streams_bp = Blueprint('streams', __name__)
 # tracks all active StreamMonitor instances
 active_streams = {}
 
+# opens captures and joins stopped monitors off the request thread
+_connector = None
+_connector_lock = threading.Lock()
+
+MAX_BULK_STREAMS = 500
+
+
+def get_connector(config):
+    global _connector
+    with _connector_lock:
+        if _connector is None:
+            _connector = ThreadPoolExecutor(
+                max_workers=config['STREAM_CONNECT_WORKERS'],
+                thread_name_prefix='stream-connector')
+        return _connector
+
+
+def start_monitor(app, stream):
+    """Register a StreamMonitor for a Stream row and connect it in the background."""
+    monitor = StreamMonitor(
+        app, stream.stream_id, stream.stream_url, regions=stream.regions,
+        evidence_mode=stream.evidence_mode)
+    previous = active_streams.get(stream.stream_id)
+    active_streams[stream.stream_id] = monitor
+    if previous:
+        previous.request_stop()
+
+    def connect():
+        # the old monitor must release the source (and its recording) before we reopen it
+        if previous:
+            previous.wait_stopped()
+        monitor.run()
+
+    get_connector(app.config).submit(connect)
+    return monitor
+
+
+def stop_monitor(stream_id):
+    """Drop a stream's StreamMonitor; it stops now, threads are joined in the background."""
+    monitor = active_streams.pop(stream_id, None)
+    if monitor:
+        monitor.request_stop()
+        get_connector(monitor.app.config).submit(monitor.wait_stopped)
+    return monitor
+
 @streams_bp.route('/streams/activate', methods=['PUT'])
 def activate_stream():
     """activate or deactivate existing stream"""
@@ -44,15 +90,13 @@ def activate_stream():
             existing_stream.started_at = datetime.datetime.utcnow()
             db.session.commit()
 
-            # create new StreamMonitor
-            active_app = app._get_current_object()
-            new_stream = StreamMonitor(
-                active_app, existing_stream.stream_id, existing_stream.stream_url)
-            new_stream.run()
-            active_streams[new_stream.stream_id] = new_stream
-            print(active_streams)
+            # create new StreamMonitor, connecting in the background
+            monitor = start_monitor(app._get_current_object(), existing_stream)
 
-            return jsonify({'message': f"Stream with URL {stream_url} activated", }), 200
+            return jsonify({
+                'message': f"Stream with URL {stream_url} activated",
+                'status': monitor.state,
+            }), 200
 
         if active == False:
             # update Stream in db to inactive
@@ -60,11 +104,7 @@ def activate_stream():
             db.session.commit()
 
             # delete associated StreamMonitor
-            stream = active_streams.pop(
-                existing_stream.stream_id, None)
-            if stream:
-                stream.stop()
-            print(active_streams)
+            stop_monitor(existing_stream.stream_id)
 
             return jsonify({'message': f"Stream with URL {stream_url} deactivated", }), 200
 
@@ -83,6 +123,14 @@ def add_stream():
 
     stream_url = data['stream_url']
 
+    regions, error = validate_regions(data.get('regions'))
+    if error:
+        return jsonify({'error': error}), 400
+
+    evidence_mode, error = validate_evidence_mode(data.get('evidence_mode'))
+    if error:
+        return jsonify({'error': error}), 400
+
     try:
         existing_stream = Stream.query.filter_by(stream_url=stream_url).first()
 
@@ -99,26 +147,197 @@ def add_stream():
             stream_id=stream_id,
             stream_url=stream_url,
             active=True,
-            started_at=datetime.datetime.utcnow()
+            started_at=datetime.datetime.utcnow(),
+            regions=regions,
+            evidence_mode=evidence_mode
         )
         db.session.add(new_stream)
         db.session.commit()
 
-        # create new StreamMonitor
-        active_app = app._get_current_object()
-        new_stream = StreamMonitor(
-            active_app, stream_id, stream_url)
-        new_stream.run()
-        active_streams[stream_id] = new_stream
-        logger.info(active_streams)
+        # create new StreamMonitor, connecting in the background
+        monitor = start_monitor(app._get_current_object(), new_stream)
 
         logger.info(f"Started monitoring stream: {stream_id} ({stream_url})")
         return jsonify({
             'message': f"Started monitoring stream with URL {stream_url}",
             'stream_id': stream_id,
-            'status': 'active'
+            'status': monitor.state
         }), 201
 
     except Exception as e:
         logger.error(f"Error adding stream with URL {stream_url}: {str(e)}")
         return jsonify({'error': 'failed to add new stream'}), 500
+
+
+@streams_bp.route('/streams/<stream_id>/regions', methods=['PUT'])
+def update_stream_regions(stream_id):
+    """Set the regions of interest and exclusion masks for a stream."""
+    data = request.json
+    if not data or 'regions' not in data:
+        return jsonify({'error': 'Missing required field: regions'}), 400
+
+    regions, error = validate_regions(data['regions'])
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        stream = Stream.query.filter_by(stream_id=stream_id).first()
+        if not stream:
+            return jsonify({'error': 'Stream not found'}), 404
+
+        stream.regions = regions
+        db.session.commit()
+
+        # running monitors pick the new regions up on their next batch
+        monitor = active_streams.get(stream_id)
+        if monitor:
+            monitor.set_regions(regions)
+
+        return jsonify(stream.to_dict()), 200
+
+    except Exception as e:
+        logger.error(f"Error updating regions for stream {stream_id}: {str(e)}")
+        return jsonify({'error': 'failed to update stream regions'}), 500
+
+
+@streams_bp.route('/streams/<stream_id>/evidence', methods=['PUT'])
+def update_stream_evidence_mode(stream_id):
+    """Choose video or keyframe evidence for a stream (null for the default)."""
+    data = request.json
+    if not data or 'evidence_mode' not in data:
+        return jsonify({'error': 'Missing required field: evidence_mode'}), 400
+
+    evidence_mode, error = validate_evidence_mode(data['evidence_mode'])
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        stream = Stream.query.filter_by(stream_id=stream_id).first()
+        if not stream:
+            return jsonify({'error': 'Stream not found'}), 404
+
+        stream.evidence_mode = evidence_mode
+        db.session.commit()
+
+        # applies from the monitor's next sighting event
+        monitor = active_streams.get(stream_id)
+        if monitor:
+            monitor.evidence_mode = evidence_mode
+
+        return jsonify(stream.to_dict()), 200
+
+    except Exception as e:
+        logger.error(f"Error updating evidence mode for stream {stream_id}: {str(e)}")
+        return jsonify({'error': 'failed to update stream evidence mode'}), 500
+
+
+@streams_bp.route('/streams/bulk', methods=['POST'])
+def add_streams_bulk():
+    """Register many streams in one transaction and connect them in the background.
+
+    Body: {"streams": [{"stream_url": ..., "regions": {...}}, ...]}. Returns
+    immediately; poll /streams/status for connection state.
+    """
+    data = request.json
+    if not data or not isinstance(data.get('streams'), list) or not data['streams']:
+        return jsonify({'error': 'Missing or empty streams list'}), 400
+
+    if len(data['streams']) > MAX_BULK_STREAMS:
+        return jsonify({'error': f"At most {MAX_BULK_STREAMS} streams per request"}), 400
+
+    requested = {}
+    for entry in data['streams']:
+        if not isinstance(entry, dict) or not entry.get('stream_url'):
+            return jsonify({'error': f"Missing stream_url in entry: {entry}"}), 400
+
+        regions, error = validate_regions(entry.get('regions'))
+        if not error:
+            evidence_mode, error = validate_evidence_mode(entry.get('evidence_mode'))
+        if error:
+            return jsonify({'error': f"{entry['stream_url']}: {error}"}), 400
+        requested.setdefault(entry['stream_url'], (regions, evidence_mode))
+
+    try:
+        existing = {
+            stream.stream_url: stream
+            for stream in Stream.query.filter(Stream.stream_url.in_(list(requested))).all()
+        }
+
+        now = datetime.datetime.utcnow()
+        new_streams = [
+            Stream(stream_id=str(uuid.uuid4()), stream_url=stream_url, active=True,
+                   started_at=now, regions=regions, evidence_mode=evidence_mode)
+            for stream_url, (regions, evidence_mode) in requested.items()
+            if stream_url not in existing
+        ]
+        db.session.add_all(new_streams)
+        db.session.commit()
+
+        active_app = app._get_current_object()
+        results = []
+        for stream in new_streams:
+            monitor = start_monitor(active_app, stream)
+            results.append({'stream_url': stream.stream_url, 'stream_id': stream.stream_id,
+                            'status': monitor.state})
+        for stream_url, stream in existing.items():
+            results.append({'stream_url': stream_url, 'stream_id': stream.stream_id,
+                            'status': 'exists', 'active': stream.active})
+
+        logger.info(f"Bulk registered {len(new_streams)} streams ({len(existing)} already existed)")
+        return jsonify({'streams': results}), 202
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error bulk adding streams: {str(e)}")
+        return jsonify({'error': 'failed to add streams'}), 500
+
+
+def _stream_status(stream):
+    monitor = active_streams.get(stream.stream_id)
+    if monitor:
+        return monitor.status()
+    return {
+        'stream_id': stream.stream_id,
+        'stream_url': stream.stream_url,
+        'state': 'inactive',
+        'error': None,
+        'since': None,
+        'recording': False,
+    }
+
+
+@streams_bp.route('/streams/status', methods=['GET'])
+def get_streams_status():
+    """Connection state of all streams, or of ?stream_id=a&stream_id=b."""
+    try:
+        stream_ids = request.args.getlist('stream_id')
+        query = Stream.query
+        if stream_ids:
+            query = query.filter(Stream.stream_id.in_(stream_ids))
+        return jsonify([_stream_status(stream) for stream in query.all()]), 200
+
+    except Exception as e:
+        logger.error(f"Error fetching stream status: {str(e)}")
+        return jsonify({'error': 'failed to fetch stream status'}), 500
+
+
+@streams_bp.route('/streams/<stream_id>/status', methods=['GET'])
+def get_stream_status(stream_id):
+    """Connection state of one stream."""
+    stream = Stream.query.filter_by(stream_id=stream_id).first()
+    if not stream:
+        return jsonify({'error': 'Stream not found'}), 404
+    return jsonify(_stream_status(stream)), 200
+
+
+@streams_bp.route('/streams/<stream_id>/preview', methods=['GET'])
+def stream_preview(stream_id):
+    """MJPEG live preview of a running stream's annotated frames."""
+    monitor = active_streams.get(stream_id)
+    if not monitor:
+        return jsonify({'error': 'Stream not active'}), 404
+
+    return Response(
+        monitor.preview.frames(),
+        mimetype=f'multipart/x-mixed-replace; boundary={BOUNDARY}',
+        headers={'Cache-Control': 'no-cache'})
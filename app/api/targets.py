@@ -3,10 +3,12 @@ import os
 import uuid
 from flask import Blueprint, current_app as app, jsonify, request
 from werkzeug.utils import secure_filename
-from deepface import DeepFace
 
 from app import db
 from app.models import Target
+from app.api.utils import not_modified, paginated_response, parse_pagination, validate_active_field
+from app.utils.gallery import gallery_store
+from app.utils.recognition import get_engine
 
 logger = logging.getLogger(__name__)
 targets_bp = Blueprint('targets', __name__)
@@ -14,10 +16,39 @@ targets_bp = Blueprint('targets', __name__)
 
 @targets_bp.route('/api/targets', methods=['GET'])
 def get_targets():
-    """Get the list of target individuals."""
+    """Get a page of target individuals, embeddings only on request."""
+    after, limit, error = parse_pagination(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    include_embedding = validate_active_field(
+        request.args.get('include_embedding', 'false')) or False
+
+    etag, response = not_modified(
+        Target.__tablename__, after, limit, int(include_embedding))
+    if response:
+        return response
+
     try:
-        targets = Target.query.all()
-        return jsonify([target.to_dict() for target in targets])
+        columns = [Target.id, Target.target_id, Target.target_name, Target.target_path]
+        if include_embedding:
+            columns.append(Target.embedding)
+
+        rows = (db.session.query(*columns)
+                .filter(Target.id > after)
+                .order_by(Target.id)
+                .limit(limit)
+                .all())
+
+        items = []
+        for row in rows:
+            item = dict(row._mapping)
+            del item['id']
+            items.append(item)
+
+        return paginated_response(
+            items, etag, rows[-1].id if rows else None, limit,
+            'targets.get_targets', include_embedding=str(include_embedding).lower())
     except Exception as e:
         logger.error(f"Error fetching targets: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -41,22 +72,23 @@ def add_target():
     target_id = str(uuid.uuid4())
 
     TARGET_DIR = app.config['TARGET_DIR']
-    RECOGNITION_MODEL = app.config['RECOGNITION_MODEL']
 
     try:
         filename = secure_filename(
             f"{target_name}{os.path.splitext(file.filename)[1]}")
-        target_path = os.mkdir(target_name)
-        filepath = os.path.join(TARGET_DIR, target_path, filename)
-        file.save(filepath)
+        target_dir = os.path.join(TARGET_DIR, secure_filename(target_name))
+        os.makedirs(target_dir, exist_ok=True)
+        target_path = os.path.join(target_dir, filename)
+        file.save(target_path)
 
-        embedding = DeepFace.represent(filepath, model_name=RECOGNITION_MODEL)[
-            0]['embedding']
+        # embed with the active engine so the gallery stays comparable
+        embedding = get_engine(app.config).represent(target_path)
 
         new_target = Target(target_id=target_id, target_name=target_name,
                             embedding=embedding, target_path=target_path)
         db.session.add(new_target)
         db.session.commit()
+        gallery_store.rebuild_async(app._get_current_object())
 
         logger.info(f"Added new target: {target_id}")
         return jsonify({'success': True, 'target_id': target_id})
@@ -76,6 +108,7 @@ def remove_target(target_id):
 
         db.session.delete(target)
         db.session.commit()
+        gallery_store.rebuild_async(app._get_current_object())
 
         if os.path.exists(target.target_path):
             os.remove(target.target_path)
@@ -86,3 +119,9 @@ def remove_target(target_id):
     except Exception as e:
         logger.error(f"Error removing target {target_id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
+
+
+@targets_bp.route('/gallery', methods=['GET'])
+def get_gallery():
+    """Get the version of the live gallery snapshot used by running streams."""
+    return jsonify(gallery_store.current.to_dict())
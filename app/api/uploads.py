@@ -3,7 +3,8 @@ import logging
 import cv2
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
-from deepface import DeepFace
+from app.utils.recognition import get_engine
+from app.utils.retention import storage_manager
 
 logger = logging.getLogger(__name__)
 
@@ -20,16 +21,22 @@ def upload_video():
     if 'video' not in request.files or 'target_id' not in request.form:
         return jsonify({'error': 'Missing video file or target ID'}), 400
 
+    if storage_manager.pressure() == storage_manager.HARD:
+        return jsonify({'error': 'Insufficient local storage, try again later'}), 507
+
     file = request.files['video']
     target_id = request.form['target_id']
+    os.makedirs(current_app.config['TEMP_VIDEO_DIR'], exist_ok=True)
     video_path = os.path.join(current_app.config['TEMP_VIDEO_DIR'], secure_filename(file.filename))
     file.save(video_path)
+    storage_manager.register(video_path, area='temp')
 
+    cap = cv2.VideoCapture(video_path)
     try:
-        cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
             return jsonify({'error': 'Could not open video file'}), 400
 
+        engine = get_engine(current_app.config)
         frame_count = 0
         extracted_faces = []
 
@@ -40,11 +47,7 @@ def upload_video():
 
             frame_count += 1
             if frame_count % 30 == 0:
-                faces = DeepFace.extract_faces(frame, enforce_detection=False)
-                extracted_faces.extend(
-                    [face['face'] for face in faces if face['confidence'] >= 0.5])
-
-        cap.release()
+                extracted_faces.extend(engine.detect(frame))
 
         if not extracted_faces:
             return jsonify({'error': 'No faces detected in the video'}), 400
@@ -53,3 +56,7 @@ def upload_video():
     except Exception as e:
         logger.error(f"Error processing video: {str(e)}")
         return jsonify({'error': str(e)}), 500
+    finally:
+        # the temp copy is only needed while extracting faces
+        cap.release()
+        storage_manager.remove(video_path)
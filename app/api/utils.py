@@ -1,3 +1,11 @@
+from flask import Response, jsonify, request, url_for
+from app.utils.evidence import EVIDENCE_MODES
+from app.utils.versions import etag_for
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
 def validate_input(data, required_fields):
     for field in required_fields:
         if field not in data or not data[field]:
@@ -20,3 +28,77 @@ def validate_active_field(active):
             return False
     
     return None
+
+
+def validate_regions(regions):
+    """Validate a stream's regions of interest.
+
+    Expects {"include": [[x, y, w, h], ...], "exclude": [[x, y, w, h], ...]}
+    with coordinates relative to the frame (0-1), so they survive capture
+    scaling. Returns (regions, error_message).
+    """
+    if regions is None:
+        return None, None
+
+    if not isinstance(regions, dict) or set(regions) - {'include', 'exclude'}:
+        return None, "regions must be an object with 'include' and/or 'exclude' lists"
+
+    cleaned = {}
+    for key in ('include', 'exclude'):
+        rects = regions.get(key) or []
+        if not isinstance(rects, list):
+            return None, f"regions.{key} must be a list of [x, y, w, h]"
+
+        cleaned[key] = []
+        for rect in rects:
+            if (not isinstance(rect, (list, tuple)) or len(rect) != 4
+                    or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in rect)):
+                return None, f"invalid rect in regions.{key}: {rect}"
+
+            x, y, w, h = (float(v) for v in rect)
+            if w <= 0 or h <= 0 or x < 0 or y < 0 or x + w > 1 + 1e-6 or y + h > 1 + 1e-6:
+                return None, f"rect in regions.{key} must lie within the frame (0-1): {rect}"
+            cleaned[key].append([x, y, w, h])
+
+    return cleaned, None
+
+
+def parse_pagination(args):
+    """Parse keyset pagination params. Returns (after_id, limit, error_message)."""
+    try:
+        after = int(args.get('after', 0))
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return None, None, "'after' and 'limit' must be integers"
+
+    if after < 0 or limit < 1:
+        return None, None, "'after' must be >= 0 and 'limit' >= 1"
+
+    return after, min(limit, MAX_PAGE_SIZE), None
+
+
+def not_modified(table, *parts):
+    """Return (etag, response) where response is a 304 if the client's copy is current."""
+    etag = etag_for(table, *parts)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return etag, response
+    return etag, None
+
+
+def paginated_response(items, etag, last_id, limit, endpoint, **params):
+    """JSON list response with an ETag and a Link header pointing at the next page."""
+    response = jsonify(items)
+    response.set_etag(etag)
+    if len(items) == limit:
+        next_url = url_for(endpoint, after=last_id, limit=limit, **params)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
+
+
+def validate_evidence_mode(mode):
+    """Returns (mode, error_message); None means use the configured default."""
+    if mode is None or mode in EVIDENCE_MODES:
+        return mode, None
+    return None, f"evidence_mode must be one of {', '.join(EVIDENCE_MODES)}"
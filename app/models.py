@@ -10,12 +10,15 @@ class Target(db.Model):
     embedding = db.Column(db.PickleType, nullable=False)
     target_path = db.Column(db.String(255), nullable=False)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include_embedding=True):
+        data = {
             'target_id': self.target_id,
-            'embedding': self.embedding,
+            'target_name': self.target_name,
             'target_path': self.target_path
         }
+        if include_embedding:
+            data['embedding'] = self.embedding
+        return data
 
 
 class Stream(db.Model):
@@ -25,13 +28,19 @@ class Stream(db.Model):
     stream_url = db.Column(db.String(255), nullable=False)
     active = db.Column(db.Boolean, default=True)
     started_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    # {"include": [[x, y, w, h], ...], "exclude": [...]} relative to the frame
+    regions = db.Column(db.JSON, nullable=True)
+    # "video" or "keyframes", falls back to EVIDENCE_MODE when unset
+    evidence_mode = db.Column(db.String(20), nullable=True)
 
     def to_dict(self):
         return {
             'stream_id': self.stream_id,
             'stream_url': self.stream_url,
             'active': self.active,
-            'started_at': self.started_at.isoformat()
+            'started_at': self.started_at.isoformat(),
+            'regions': self.regions,
+            'evidence_mode': self.evidence_mode
         }
 
 
@@ -50,3 +59,28 @@ class Contact(db.Model):
             'contact_phone': self.contact_phone,
             'active': self.active
         }
+
+
+class Sighting(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    stream_id = db.Column(db.String(255), nullable=False, index=True)
+    target_name = db.Column(db.String(120), nullable=False, index=True)
+    distance = db.Column(db.Float, nullable=True)
+    seen_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'stream_id': self.stream_id,
+            'target_name': self.target_name,
+            'distance': self.distance,
+            'seen_at': self.seen_at.isoformat()
+        }
+
+
+class TableVersion(db.Model):
+    """Change counter per table, shared by every worker process (see app.utils.versions)."""
+    __tablename__ = 'table_version'
+
+    table_name = db.Column(db.String(80), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
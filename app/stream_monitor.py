@@ -4,72 +4,127 @@ import threading
 import cv2
 import logging
 import datetime
-from deepface import DeepFace
-from app.utils.storage import upload_to_s3
-from app.utils.notifications import send_email_alert, send_sms_alert
-from app import db
+from app.utils.capture import open_capture
+from app.utils.evidence import annotate, open_evidence
+from app.utils.retention import storage_manager
+from app.utils.alerts import alert_correlator
+from app.utils.gallery import gallery_store
+from app.utils.preview import PreviewBroadcaster
+from app.utils.recognition import get_engine
+from app.utils.roi import crop_regions, offset_matches
+from app.utils.database import batch_writer
+from app.models import Sighting
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class StreamMonitor(threading.Thread):
-    def __init__(self, app, stream_id, stream_url=0, max_queue=60, daemon=True):
+    # connection states reported by the streams status endpoint
+    PENDING = 'pending'
+    CONNECTING = 'connecting'
+    LIVE = 'live'
+    FAILED = 'failed'
+    STOPPED = 'stopped'
+
+    def __init__(self, app, stream_id, stream_url=0, regions=None, evidence_mode=None,
+                 max_queue=60, daemon=True):
         super().__init__(daemon=daemon)
         self.app = app
         self.stream_id = stream_id
         self.stream_url = stream_url
+        self.regions = regions
+        self.max_queue = max_queue
         self.active = False
         self.recording = False
         self.empty_frames = 0
 
-        # OpenCV Video Capture
-        self.cap = cv2.VideoCapture(int(stream_url))
-        if not self.cap.isOpened():
-            logger.error(f"Failed to open stream: {stream_url}")
-            self.active = False
-            return
+        # lifecycle; run() may execute on a background connector thread
+        self.state = self.PENDING
+        self.error = None
+        self.state_changed_at = datetime.datetime.utcnow()
+        self._lifecycle_lock = threading.Lock()
+        self._stop_requested = False
+        # set once run() has returned, whether it connected, failed or was cancelled
+        self._run_finished = threading.Event()
+
+        self.batch_size = app.config['RECOGNITION_BATCH_SIZE']
+        self.cap = None
+        self.engine = None
 
         # frame queue
         self.queue = queue.Queue(maxsize=max_queue)
 
         # capture and processing threads
         self.capture_thread = threading.Thread(
-            target=self._capture_frames, daemon=True)
+            target=self._capture_frames, name=f"capture-{stream_id}", daemon=True)
 
         self.process_thread = threading.Thread(
-            target=self._process_frames, daemon=True)
+            target=self._process_frames, name=f"process-{stream_id}", daemon=True)
+
+        # live preview for any number of viewers
+        self.preview = PreviewBroadcaster(
+            max_width=app.config['PREVIEW_MAX_WIDTH'],
+            max_fps=app.config['PREVIEW_MAX_FPS'],
+            quality=app.config['PREVIEW_JPEG_QUALITY'])
 
         # recordings
-        self.video_writer = None
+        self.evidence_mode = evidence_mode
+        self.evidence = None
         self.out_path = None
+        self.storage_full = False
+
+    def _set_state(self, state, error=None):
+        self.state = state
+        self.error = error
+        self.state_changed_at = datetime.datetime.utcnow()
+
+    def status(self):
+        return {
+            'stream_id': self.stream_id,
+            'stream_url': self.stream_url,
+            'state': self.state,
+            'error': self.error,
+            'since': self.state_changed_at.isoformat(),
+            'recording': self.recording,
+        }
 
     def _start_recording(self):
-        """Start a new recording session."""
+        """Start a new evidence recording for a sighting event."""
+        # storage back-pressure may downgrade video to keyframes or skip recording
+        mode = storage_manager.evidence_mode_for(
+            self.stream_id, self.evidence_mode or self.app.config['EVIDENCE_MODE'])
+        if mode is None:
+            if not self.storage_full:
+                logger.warning(f"Storage full, not recording stream {self.stream_id}")
+            self.storage_full = True
+            return
+        self.storage_full = False
+
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        save_dir = os.path.join("recordings", str(self.stream_id))
+        save_dir = os.path.join(self.app.config['STORAGE_RECORDINGS_DIR'], str(self.stream_id))
         os.makedirs(save_dir, exist_ok=True)
 
-        self.out_path = os.path.join(save_dir, f"{timestamp}.mp4")
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
         frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 20.0
 
-        self.video_writer = cv2.VideoWriter(
-            self.out_path, fourcc, 20.0, (frame_width, frame_height))
+        self.evidence = open_evidence(
+            mode, save_dir, timestamp, (frame_width, frame_height), fps, self.app.config)
+        self.out_path = self.evidence.path
 
         self.recording = True
 
         logger.info(f"🎥 Started recording: {self.out_path}")
 
     def _stop_recording(self):
-        """Stop the current recording session."""
-        if self.video_writer:
-            self.video_writer.release()
+        """Stop the current recording session and hand it to the storage manager."""
+        if self.evidence:
+            self.evidence.close()
             logger.info(f"✅ Saved recording: {self.out_path}")
-            self.video_writer = None
+            storage_manager.register(self.out_path, stream_id=self.stream_id)
+            self.evidence = None
             self.out_path = None
-            # add logic to save the recording to S3 and delete local file
 
         self.recording = False
 
@@ -80,66 +135,187 @@ class StreamMonitor(threading.Thread):
             if not ret:
                 logger.warning(
                     f"Failed to read frame from stream {self.stream_id}")
+                if self.active:
+                    self._set_state(self.FAILED, 'stream ended')
                 break
 
             if self.queue.full():
                 self.queue.get()
             self.queue.put(frame)
 
+    def _next_batch(self):
+        """Block for one frame, then drain whatever else is queued up to the batch size."""
+        frames = [self.queue.get(timeout=1)]
+        while len(frames) < self.batch_size:
+            try:
+                frames.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return frames
+
+    def _handle_frame(self, frame, matches):
+        """Annotate a processed frame and drive the recording state."""
+        if not matches:
+            self.preview.publish(frame)
+            self.empty_frames += 1
+            if self.empty_frames >= 15 and self.recording:
+                self._stop_recording()
+            return
+
+        for match in matches:
+            # one Sighting row per sighting event (outside the per-stream cooldown),
+            # not one per face per frame
+            if match['identity'] != 'Unknown' and alert_correlator.record(
+                    match['identity'], self.stream_id):
+                batch_writer.add(Sighting(
+                    stream_id=self.stream_id, target_name=match['identity'],
+                    distance=match.get('distance'), seen_at=datetime.datetime.utcnow()))
+
+        if not self.recording:
+            self._start_recording()
+
+        # keyframe evidence samples the raw frame, video records the annotated one
+        if self.evidence:
+            self.evidence.observe(frame, matches)
+        annotate(frame, matches)
+        if self.evidence:
+            self.evidence.write(frame)
+        self.preview.publish(frame)
+        self.empty_frames = 0
+
+    def _recognize(self, frames):
+        """Run recognition on the regions of interest of a batch of frames."""
+        # one snapshot and one regions config per batch, both swapped by reference
+        snapshot = gallery_store.current
+        regions = self.regions
+
+        crops, owners = [], []
+        for frame_idx, frame in enumerate(frames):
+            for crop, offset in crop_regions(frame, regions):
+                crops.append(crop)
+                owners.append((frame_idx, offset))
+
+        results = [[] for _ in frames]
+        if not crops:
+            return results
+
+        try:
+            crop_results = self.engine.find_batch(crops, snapshot.gallery)
+        except Exception as e:
+            logger.error(f"Recognition failed on stream {self.stream_id}: {str(e)}")
+            return results
+
+        for (frame_idx, offset), matches in zip(owners, crop_results):
+            results[frame_idx].extend(offset_matches(matches, offset))
+        return results
+
     def _process_frames(self):
-      while self.active:
-          try:
-              frame = self.queue.get(timeout=1)
-          except queue.Empty:
-              continue
-
-          try:
-              results = DeepFace.find(
-                  img_path=frame,
-                  db_path=self.app.config["TARGET_DIR"],
-                  model_name=self.app.config["RECOGNITION_MODEL_NAME"],
-                  distance_metric=self.app.config["RECOGNITION_DISTANCE_METRIC"],
-                  detector_backend=self.app.config["RECOGNITION_DETECTOR_BACKEND"],
-                  enforce_detection=True,  # Force detection
-                  silent=True,
-              )
-
-              if not results or results[0].empty:
-                  raise ValueError("No faces detected in frame")
-
-              for result in results[0].to_dict('records'):
-                  x, y, w, h = result['source_x'], result['source_y'], result['source_w'], result['source_h']
-                  identity = result.get('identity', 'Unknown').split('/')[1]
-                  
-                  if identity!= 'Unknown':
-                    logger.info(f'hi {identity}')
-                  
-                  cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                  cv2.putText(frame, identity, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
-
-              if not self.recording:
-                  self._start_recording()
-                  
-              self.video_writer.write(frame)
-              self.empty_frames = 0
-
-          except Exception as e:
-              self.empty_frames += 1
-              if self.empty_frames >= 15 and self.recording:
-                  self._stop_recording()
+        while self.active:
+            try:
+                frames = self._next_batch()
+            except queue.Empty:
+                continue
+
+            results = self._recognize(frames)
+            for frame, matches in zip(frames, results):
+                self._handle_frame(frame, matches)
 
+    def threads(self):
+        """Worker threads owned by this monitor (used by the profiler)."""
+        threads = [self.capture_thread, self.process_thread]
+        evidence = self.evidence
+        if evidence is not None and evidence.thread is not None:
+            threads.append(evidence.thread)
+        return threads
+
+    def set_regions(self, regions):
+        """Replace the regions of interest; picked up on the next batch."""
+        self.regions = regions
 
     def run(self):
-        """Start processing"""
-        self.active = True
-        self.capture_thread.start()
-        self.process_thread.start()
+        """Open the capture and start processing.
 
-    def stop(self):
-        """stop monitoring"""
-        self.active = False
-        self.capture_thread.join()
-        self.process_thread.join()
-        self.cap.release()
+        Blocks while the capture connects, so the API calls it from a
+        background connector rather than the request thread.
+        """
+        try:
+            self._connect()
+        finally:
+            self._run_finished.set()
+
+    def _connect(self):
+        with self._lifecycle_lock:
+            if self._stop_requested:
+                return
+            self._set_state(self.CONNECTING)
+
+        try:
+            # recognition engine and target gallery
+            self.engine = get_engine(self.app.config)
+            gallery_store.ensure(self.app)
+
+            # video capture; with the ffmpeg backend frames live in a ring that
+            # must outlast everything queued or in flight
+            cap = open_capture(
+                self.stream_url, self.app.config,
+                buffers=self.max_queue + self.batch_size + 2)
+        except Exception as e:
+            logger.error(f"Failed to start stream {self.stream_id}: {str(e)}")
+            self._set_state(self.FAILED, str(e))
+            return
+
+        if not cap.isOpened():
+            logger.error(f"Failed to open stream: {self.stream_url}")
+            cap.release()
+            self._set_state(self.FAILED, 'could not open stream')
+            return
+
+        with self._lifecycle_lock:
+            # deactivated while connecting
+            if self._stop_requested:
+                cap.release()
+                return
+            self.cap = cap
+            self.active = True
+            self.capture_thread.start()
+            self.process_thread.start()
+            self._set_state(self.LIVE)
+
+    def request_stop(self):
+        """Flag the monitor to stop; returns immediately, threads wind down on their own."""
+        with self._lifecycle_lock:
+            self._stop_requested = True
+            self.active = False
+            cap = self.cap
+        self.preview.close()
+        # unblock a capture thread stuck reading from a stalled source
+        interrupt = getattr(cap, 'interrupt', None)
+        if interrupt is not None:
+            interrupt()
+
+    def wait_stopped(self):
+        """Wait for run() and the worker threads, then release the capture and recording.
+
+        Call after request_stop(); once this returns the source is closed.
+        """
+        self._run_finished.wait()
+        if self.capture_thread.is_alive():
+            self.capture_thread.join(timeout=5)
+            interrupt = getattr(self.cap, 'interrupt', None)
+            if self.capture_thread.is_alive() and interrupt is not None:
+                # ffmpeg ignored the terminate from request_stop()
+                interrupt(force=True)
+            self.capture_thread.join()
+        if self.process_thread.is_alive():
+            self.process_thread.join()
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
         if self.recording:
             self._stop_recording()
+        self._set_state(self.STOPPED)
+
+    def stop(self):
+        """stop monitoring"""
+        self.request_stop()
+        self.wait_stopped()
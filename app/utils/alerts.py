@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+import datetime
+from collections import defaultdict, deque
+
+from app.utils.contacts import contact_directory
+from app.utils.notifications import send_email, send_email_alert, send_sms, send_sms_alert
+
+logger = logging.getLogger(__name__)
+
+
+class AlertCorrelator:
+    """Turns per-frame sightings into a bounded number of outbound alerts.
+
+    - a (target, stream) pair alerts at most once per ``cooldown`` seconds
+    - sightings of one target on several streams within ``merge_window``
+      seconds go out as a single alert listing every stream
+    - at most ``max_per_minute`` alerts are sent; groups over budget stay
+      pending and go out as soon as the budget frees up
+    - suppressed (cooldown) sightings are summarised in a digest every
+      ``digest_interval`` seconds (0 disables digests)
+
+    record() only touches in-memory state, so monitor threads never wait on
+    SMTP or Twilio; sending happens on the correlator's own thread.
+    """
+
+    def __init__(self, cooldown=300, merge_window=10, digest_interval=0, max_per_minute=6):
+        self.app = None
+        self.cooldown = cooldown
+        self.merge_window = merge_window
+        self.digest_interval = digest_interval
+        self.max_per_minute = max_per_minute
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+        self._last_alerted = {}                 # (target, stream) -> monotonic time
+        self._pending = {}                      # target -> open merge group
+        self._sent = deque()                    # monotonic times of recent sends
+        self._digest = defaultdict(lambda: defaultdict(int))  # target -> stream -> sightings
+        self._last_digest = time.monotonic()
+
+    def init_app(self, app):
+        self.app = app
+        self.cooldown = app.config['ALERT_COOLDOWN_SECONDS']
+        self.merge_window = app.config['ALERT_MERGE_WINDOW_SECONDS']
+        self.digest_interval = app.config['ALERT_DIGEST_INTERVAL_SECONDS']
+        self.max_per_minute = app.config['ALERT_MAX_PER_MINUTE']
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name='alert-correlator', daemon=True)
+            self._thread.start()
+
+    def record(self, target, stream_id, timestamp=None, video_url=None):
+        """Register a sighting; returns True if it opened or joined an alert."""
+        now = time.monotonic()
+        timestamp = timestamp or datetime.datetime.utcnow().isoformat()
+        key = (target, stream_id)
+
+        with self._lock:
+            last = self._last_alerted.get(key)
+            if last is not None and now - last < self.cooldown:
+                if self.digest_interval:
+                    self._digest[target][stream_id] += 1
+                return False
+
+            self._last_alerted[key] = now
+            group = self._pending.get(target)
+            if group is None:
+                self._pending[target] = {
+                    'opened': now,
+                    'timestamp': timestamp,
+                    'streams': [stream_id],
+                    'video_url': video_url,
+                }
+            elif stream_id not in group['streams']:
+                group['streams'].append(stream_id)
+                group['video_url'] = group['video_url'] or video_url
+
+            self._ensure_worker()
+
+        self._wake.set()
+        return True
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=1)
+            self._wake.clear()
+            try:
+                self._flush()
+            except Exception as e:
+                logger.error(f"Alert correlator error: {str(e)}")
+
+    def _flush(self):
+        now = time.monotonic()
+        digest = None
+
+        with self._lock:
+            # forget pairs whose cooldown has run out
+            for key, last in list(self._last_alerted.items()):
+                if now - last >= self.cooldown:
+                    del self._last_alerted[key]
+
+            while self._sent and now - self._sent[0] >= 60:
+                self._sent.popleft()
+
+            sendable = []
+            for target, group in list(self._pending.items()):
+                if now - group['opened'] < self.merge_window:
+                    continue
+                if len(self._sent) < self.max_per_minute:
+                    self._sent.append(now)
+                    sendable.append((target, self._pending.pop(target)))
+                elif not group.get('deferred'):
+                    # stays pending (and keeps merging streams) until the budget frees up
+                    group['deferred'] = True
+                    logger.warning(f"Alert budget exhausted, deferring alert for {target}")
+
+            if self.digest_interval and now - self._last_digest >= self.digest_interval:
+                self._last_digest = now
+                if self._digest:
+                    digest = {t: dict(s) for t, s in self._digest.items()}
+                    self._digest.clear()
+
+        for target, group in sendable:
+            self._send_alert(target, group)
+        if digest:
+            self._send_digest(digest)
+
+    def _send_alert(self, target, group):
+        config = self.app.config
+        # each channel on its own, so an SMTP outage does not also drop the SMS
+        try:
+            send_email_alert(
+                target, group['timestamp'], group['video_url'],
+                contact_directory.recipients('email'), config, streams=group['streams'])
+        except Exception as e:
+            logger.error(f"Failed to send email alert for {target}: {str(e)}")
+        try:
+            send_sms_alert(
+                target, group['timestamp'], group['video_url'],
+                contact_directory.recipients('sms'), config, streams=group['streams'])
+        except Exception as e:
+            logger.error(f"Failed to send SMS alert for {target}: {str(e)}")
+
+    def _send_digest(self, digest):
+        config = self.app.config
+        lines = [
+            f"{target}: {sum(streams.values())} sightings on {', '.join(sorted(streams))}"
+            for target, streams in sorted(digest.items())
+        ]
+        body = '\n'.join(lines)
+        try:
+            send_email(
+                f"Recognition digest: {len(digest)} targets", body,
+                contact_directory.recipients('email'), config)
+        except Exception as e:
+            logger.error(f"Failed to send email digest: {str(e)}")
+        try:
+            send_sms(f"Recognition digest:\n{body}", contact_directory.recipients('sms'), config)
+        except Exception as e:
+            logger.error(f"Failed to send SMS digest: {str(e)}")
+
+
+# process-wide correlator, bound to the app in create_app
+alert_correlator = AlertCorrelator()
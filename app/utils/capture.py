@@ -0,0 +1,170 @@
+import logging
+import subprocess
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def parse_source(stream_url):
+    """Camera indexes arrive as strings from the API, cv2 wants them as ints."""
+    if isinstance(stream_url, str) and stream_url.strip().isdigit():
+        return int(stream_url)
+    return stream_url
+
+
+def network_input_args(source, io_timeout=None):
+    """ffmpeg/ffprobe input options for a URL source, including a socket timeout.
+
+    Without a timeout a stalled camera blocks the pipe read forever.
+    """
+    args = []
+    if source.startswith('rtsp://'):
+        args += ['-rtsp_transport', 'tcp']
+        if io_timeout:
+            args += ['-timeout', str(int(io_timeout * 1000000))]
+    elif '://' in source and io_timeout:
+        args += ['-rw_timeout', str(int(io_timeout * 1000000))]
+    return args
+
+
+def probe_size(source, ffprobe_path='ffprobe', timeout=15, input_args=()):
+    """Return the native (width, height) of a source using ffprobe."""
+    output = subprocess.run(
+        [ffprobe_path, '-v', 'error', *input_args, '-select_streams', 'v:0',
+         '-show_entries', 'stream=width,height', '-of', 'csv=p=0', source],
+        capture_output=True, text=True, timeout=timeout, check=True).stdout
+    width, height = output.strip().splitlines()[0].split(',')[:2]
+    return int(width), int(height)
+
+
+class FFmpegCapture:
+    """cv2.VideoCapture look-alike that decodes through an ffmpeg subprocess.
+
+    ffmpeg applies ``fps=`` and ``scale=`` at the decoder and writes raw BGR
+    frames to a pipe, which are read straight into a ring of preallocated
+    NumPy buffers. A frame returned by ``read()`` stays valid until
+    ``buffers`` further reads, so the ring must be larger than the number of
+    frames the caller keeps queued.
+    """
+
+    def __init__(self, source, fps=None, width=None, height=None, buffers=4,
+                 ffmpeg_path='ffmpeg', ffprobe_path='ffprobe', io_timeout=None):
+        self.source = source
+        self.fps = fps
+        self.proc = None
+
+        if isinstance(source, int):
+            source_args = []
+            input_args = ['-f', 'v4l2', '-i', f'/dev/video{source}']
+            probe_source = f'/dev/video{source}'
+        else:
+            source_args = network_input_args(source, io_timeout)
+            input_args = source_args + ['-i', source]
+            probe_source = source
+
+        try:
+            if not (width and height):
+                native_w, native_h = probe_size(
+                    probe_source, ffprobe_path, input_args=source_args)
+                if width:
+                    height = native_h * width // native_w
+                elif height:
+                    width = native_w * height // native_h
+                else:
+                    width, height = native_w, native_h
+            # most encoders and scalers want even dimensions
+            self.width, self.height = width - width % 2, height - height % 2
+        except Exception as e:
+            logger.error(f"Failed to probe stream {source}: {str(e)}")
+            return
+
+        filters = []
+        if fps:
+            filters.append(f'fps={fps}')
+        filters.append(f'scale={self.width}:{self.height}')
+
+        cmd = [ffmpeg_path, '-nostdin', '-loglevel', 'error', *input_args,
+               '-an', '-vf', ','.join(filters),
+               '-pix_fmt', 'bgr24', '-f', 'rawvideo', 'pipe:1']
+
+        self.frame_bytes = self.width * self.height * 3
+        self.buffers = [
+            np.empty((self.height, self.width, 3), dtype=np.uint8) for _ in range(buffers)]
+        self.next_buffer = 0
+
+        try:
+            self.proc = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                bufsize=self.frame_bytes)
+        except OSError as e:
+            logger.error(f"Failed to start ffmpeg for {source}: {str(e)}")
+            self.proc = None
+
+    def isOpened(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def read(self):
+        """Read the next frame into the ring; returns (ret, frame) like cv2."""
+        if self.proc is None:
+            return False, None
+
+        frame = self.buffers[self.next_buffer]
+        view = memoryview(frame.reshape(-1))
+        filled = 0
+        while filled < self.frame_bytes:
+            n = self.proc.stdout.readinto(view[filled:])
+            if not n:
+                return False, None
+            filled += n
+
+        self.next_buffer = (self.next_buffer + 1) % len(self.buffers)
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(getattr(self, 'width', 0))
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(getattr(self, 'height', 0))
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps or 0)
+        return 0.0
+
+    def interrupt(self, force=False):
+        """Stop ffmpeg so a read() blocked on the pipe returns; release() still cleans up."""
+        proc = self.proc
+        if proc is not None and proc.poll() is None:
+            if force:
+                proc.kill()
+            else:
+                proc.terminate()
+
+    def release(self):
+        if self.proc is None:
+            return
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        self.proc = None
+
+
+def open_capture(stream_url, config, buffers=4):
+    """Open a capture for a stream using the backend selected by CAPTURE_BACKEND."""
+    source = parse_source(stream_url)
+
+    if config['CAPTURE_BACKEND'] == 'ffmpeg':
+        return FFmpegCapture(
+            source,
+            fps=config['CAPTURE_FPS'],
+            width=config['CAPTURE_WIDTH'],
+            height=config['CAPTURE_HEIGHT'],
+            buffers=buffers,
+            ffmpeg_path=config['FFMPEG_PATH'],
+            ffprobe_path=config['FFPROBE_PATH'],
+            io_timeout=config['CAPTURE_IO_TIMEOUT'])
+
+    return cv2.VideoCapture(source)
@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+
+from app.utils.versions import get_version
+
+logger = logging.getLogger(__name__)
+
+
+class ContactDirectory:
+    """In-memory directory of active contacts, pre-grouped by alert channel.
+
+    Recipients come back as the dicts send_email_alert/send_sms_alert
+    expect. The directory reloads after invalidate(), or once ``ttl``
+    seconds have passed and the shared contact table version shows a change
+    (made by any worker process). Lookups need no request context and,
+    while the cache is warm, no database round-trip.
+    """
+
+    CHANNELS = ('email', 'sms')
+
+    def __init__(self, ttl=60):
+        self.app = None
+        self.ttl = ttl
+        self._groups = None
+        self._loaded_version = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.ttl = app.config.get('CONTACT_DIRECTORY_TTL', self.ttl)
+
+    def invalidate(self):
+        self._groups = None
+
+    def _is_stale(self, groups):
+        return groups is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def _refresh(self, current):
+        """Return the directory to use, reloading it unless the version is unchanged."""
+        from app import db
+        from app.models import Contact
+
+        with self.app.app_context():
+            version = get_version('contact')
+            if current is not None and version == self._loaded_version:
+                # nothing changed since the last load, keep the cache
+                self._loaded_at = time.monotonic()
+                return current
+            rows = (db.session.query(
+                        Contact.contact_name, Contact.contact_email, Contact.contact_phone)
+                    .filter(Contact.active.is_(True))
+                    .all())
+
+        groups = {channel: [] for channel in self.CHANNELS}
+        for name, email, phone in rows:
+            if email:
+                groups['email'].append({'name': name, 'email': email})
+            if phone:
+                groups['sms'].append({'name': name, 'phone': phone})
+
+        # publish in one assignment so readers never see a half-built directory
+        loaded = {channel: tuple(recipients) for channel, recipients in groups.items()}
+        self._groups = loaded
+        self._loaded_version = version
+        self._loaded_at = time.monotonic()
+        logger.info(
+            f"Loaded contact directory: {len(loaded['email'])} email, {len(loaded['sms'])} sms")
+        return loaded
+
+    def recipients(self, channel):
+        """Return the active recipients for a channel ('email' or 'sms')."""
+        # read the shared reference once: invalidate() may clear it at any time
+        groups = self._groups
+        if self._is_stale(groups):
+            with self._lock:
+                groups = self._groups
+                if self._is_stale(groups):
+                    groups = self._refresh(groups)
+        return groups[channel]
+
+
+# process-wide directory, bound to the app in create_app
+contact_directory = ContactDirectory()
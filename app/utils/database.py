@@ -0,0 +1,162 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# one sessionmaker per app, bound to its pooled engine
+_session_factories = {}
+_factories_lock = threading.Lock()
+
+
+def configure_sqlite(engine, config):
+    """Apply WAL and tuned pragmas to every new SQLite connection in the pool."""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # readers no longer block the writer (and vice versa)
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+        cursor.execute(f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+
+def add_missing_columns(engine, metadata):
+    """ALTER existing tables to add nullable columns added to the models since.
+
+    create_all() only creates missing tables, so databases from before a
+    new optional column (e.g. stream.regions) would otherwise fail on every
+    query touching that table.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    logger.error(f"Cannot add required column {table.name}.{column.name}, "
+                                 f"migrate this table by hand")
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                added.append(f"{table.name}.{column.name}")
+
+    if added:
+        logger.info(f"Added missing columns: {', '.join(added)}")
+    return added
+
+
+def _session_factory(app):
+    with _factories_lock:
+        factory = _session_factories.get(app)
+        if factory is None:
+            from app import db
+            with app.app_context():
+                engine = db.engine
+            factory = sessionmaker(bind=engine, expire_on_commit=False)
+            _session_factories[app] = factory
+        return factory
+
+
+@contextmanager
+def worker_session(app):
+    """Session for background threads: no app context needed, commits on success."""
+    session = _session_factory(app)()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def commit_in_batches(app, objects, batch_size=100):
+    """Insert objects with one transaction per ``batch_size`` rows."""
+    objects = list(objects)
+    for start in range(0, len(objects), batch_size):
+        with worker_session(app) as session:
+            session.add_all(objects[start:start + batch_size])
+    return len(objects)
+
+
+class BatchWriter:
+    """Single background writer that commits rows queued by many threads.
+
+    add() never touches the database, so monitor threads never wait on a
+    lock; the writer thread commits every ``batch_size`` rows or
+    ``interval`` seconds, whichever comes first, keeping SQLite to one
+    short write transaction at a time.
+    """
+
+    def __init__(self, batch_size=100, interval=1.0, max_pending=10000):
+        self.app = None
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config['DB_BATCH_SIZE']
+        self.interval = app.config['DB_BATCH_INTERVAL']
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='db-batch-writer', daemon=True)
+                self._thread.start()
+
+    def add(self, obj):
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait(obj)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"DB batch writer is behind, dropped {self.dropped} rows")
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            try:
+                with worker_session(self.app) as session:
+                    session.add_all(batch)
+            except Exception as e:
+                logger.error(f"Failed to commit {len(batch)} rows: {str(e)}")
+
+
+# process-wide writer for monitor threads, bound to the app in create_app
+batch_writer = BatchWriter()
@@ -0,0 +1,152 @@
+import os
+import json
+import queue
+import logging
+import threading
+import time
+import zipfile
+import cv2
+
+logger = logging.getLogger(__name__)
+
+EVIDENCE_MODES = ('video', 'keyframes')
+
+
+def annotate(frame, matches):
+    """Draw match boxes and identities onto a frame in place."""
+    for match in matches:
+        x, y, w, h = match['x'], match['y'], match['w'], match['h']
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        cv2.putText(frame, match['identity'], (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
+
+
+class VideoEvidence:
+    """Continuous mp4v recording of annotated frames."""
+
+    def __init__(self, save_dir, timestamp, frame_size, fps, config):
+        self.path = os.path.join(save_dir, f"{timestamp}.mp4")
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        self.video_writer = cv2.VideoWriter(self.path, fourcc, fps, frame_size)
+        self.thread = None
+
+    def observe(self, frame, matches):
+        pass
+
+    def write(self, frame):
+        self.video_writer.write(frame)
+
+    def close(self):
+        self.video_writer.release()
+        return self.path
+
+
+class KeyframeEvidence:
+    """Face crops plus annotated keyframes, bundled into one archive per event.
+
+    observe() copies a raw frame at most once per ``interval`` seconds (and
+    at most ``max_keyframes`` per event); a background thread crops,
+    annotates and encodes the samples and appends them to
+    ``<timestamp>.zip`` together with a manifest of every sighting.
+    """
+
+    def __init__(self, save_dir, timestamp, frame_size, fps, config):
+        self.path = os.path.join(save_dir, f"{timestamp}.zip")
+        self.interval = config['EVIDENCE_KEYFRAME_INTERVAL']
+        self.max_keyframes = config['EVIDENCE_MAX_KEYFRAMES']
+        self.format = config['EVIDENCE_IMAGE_FORMAT']
+        self.quality = config['EVIDENCE_IMAGE_QUALITY']
+
+        self.keyframes = 0
+        self.last_sample = 0.0
+        self.manifest = []
+
+        self.queue = queue.Queue(maxsize=8)
+        self.thread = threading.Thread(
+            target=self._encode, name=f"evidence-{os.path.basename(save_dir)}", daemon=True)
+        self.thread.start()
+
+    def observe(self, frame, matches):
+        now = time.monotonic()
+        if self.keyframes >= self.max_keyframes or now - self.last_sample < self.interval:
+            return
+
+        try:
+            self.queue.put_nowait((time.time(), frame.copy(), [dict(m) for m in matches]))
+        except queue.Full:
+            # the encoder is behind, skip this sample rather than stall the stream
+            return
+        self.last_sample = now
+        self.keyframes += 1
+
+    def write(self, frame):
+        pass
+
+    def _encode_image(self, image):
+        if self.format == 'webp':
+            params = [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        ok, buffer = cv2.imencode(f".{self.format}", image, params)
+        return buffer.tobytes() if ok else None
+
+    def _write_sample(self, archive, sampled_at, frame, matches):
+        index = len(self.manifest) + 1
+        entry = {'timestamp': sampled_at, 'keyframe': None, 'faces': []}
+
+        for face_no, match in enumerate(matches, start=1):
+            x, y, w, h = match['x'], match['y'], match['w'], match['h']
+            crop = frame[max(y, 0):y + h, max(x, 0):x + w]
+            if not crop.size:
+                continue
+            crop = self._encode_image(crop)
+            if crop is None:
+                continue
+            name = f"crops/{index:04d}_{face_no}.{self.format}"
+            archive.writestr(name, crop)
+            entry['faces'].append({
+                'crop': name, 'identity': match['identity'],
+                'distance': match.get('distance'), 'box': [x, y, w, h],
+            })
+
+        annotate(frame, matches)
+        keyframe = self._encode_image(frame)
+        if keyframe is not None:
+            entry['keyframe'] = f"keyframes/{index:04d}.{self.format}"
+            archive.writestr(entry['keyframe'], keyframe)
+
+        self.manifest.append(entry)
+
+    def _encode(self):
+        with zipfile.ZipFile(self.path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+
+                try:
+                    self._write_sample(archive, *item)
+                except Exception as e:
+                    # one bad sample (e.g. an empty crop) must not lose the whole event
+                    logger.error(f"Failed to encode evidence sample for {self.path}: {str(e)}")
+
+            archive.writestr('manifest.json', json.dumps(self.manifest, indent=2))
+
+    def close(self, timeout=30):
+        # never block the monitor on an encoder that has already died
+        while self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=1)
+                break
+            except queue.Full:
+                continue
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            logger.warning(f"Evidence encoder for {self.path} did not finish in {timeout}s")
+        return self.path
+
+
+def open_evidence(mode, save_dir, timestamp, frame_size, fps, config):
+    """Start an evidence recorder for one sighting event."""
+    if mode == 'video':
+        return VideoEvidence(save_dir, timestamp, frame_size, fps, config)
+    return KeyframeEvidence(save_dir, timestamp, frame_size, fps, config)
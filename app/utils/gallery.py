@@ -0,0 +1,514 @@
+import os
+import logging
+import tempfile
+import threading
+import datetime
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(vectors):
+    """L2-normalize rows so cosine similarity becomes a dot product."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class Gallery:
+    """Matrix of target embeddings matched against query faces in one pass."""
+
+    def __init__(self, names, embeddings):
+        self.names = list(names)
+        if len(self.names):
+            self.embeddings = normalize(embeddings)
+        else:
+            self.embeddings = np.empty((0, 0), dtype=np.float32)
+
+    @classmethod
+    def from_rows(cls, rows, dim=None):
+        """Build a gallery from (target_name, embedding) rows, skipping embeddings of the wrong size."""
+        names, embeddings = [], []
+        for chunk_names, chunk in _chunks(rows, 65536, dim):
+            names.extend(chunk_names)
+            embeddings.append(chunk)
+        return cls(names, np.concatenate(embeddings) if embeddings else [])
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def dim(self):
+        return self.embeddings.shape[1] if len(self) else None
+
+    def match(self, embeddings, threshold):
+        """Return (identity, cosine distance) for each query embedding."""
+        queries = normalize(embeddings)
+        if not len(self) or not len(queries):
+            return [('Unknown', 1.0) for _ in range(len(queries))]
+
+        similarities = queries @ self.embeddings.T
+        best = similarities.argmax(axis=1)
+        distances = 1.0 - similarities[np.arange(len(queries)), best]
+
+        return [
+            (self.names[idx] if dist <= threshold else 'Unknown', float(dist))
+            for idx, dist in zip(best, distances)
+        ]
+
+    def search(self, embeddings, k=1):
+        """Return (indices, similarities) of the k nearest targets per query."""
+        queries = normalize(embeddings)
+        similarities = queries @ self.embeddings.T
+        k = min(k, len(self))
+        top = np.argsort(-similarities, axis=1)[:, :k]
+        return top, np.take_along_axis(similarities, top, axis=1)
+
+
+def _kmeans(data, n_clusters, iterations=20, seed=0):
+    """Plain Lloyd's k-means used to train product quantization codebooks."""
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(data))
+    centroids = data[rng.choice(len(data), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        distances = (
+            (data ** 2).sum(axis=1, keepdims=True)
+            - 2 * data @ centroids.T
+            + (centroids ** 2).sum(axis=1))
+        assignment = distances.argmin(axis=1)
+        for c in range(n_clusters):
+            members = data[assignment == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+    return centroids
+
+
+class Quantizer:
+    """Encodes normalized embeddings into compact codes and scores queries against them.
+
+    Trained on a bounded sample (the first chunk written) and reused by
+    later rebuilds with the same mode and dimension, so adding a target does
+    not retrain PQ codebooks or recalibrate int8 scales. It is retrained
+    once the gallery outgrows its sample (see reusable()).
+    """
+
+    # retrain once the gallery is this many times larger than the sample
+    RETRAIN_GROWTH = 2
+
+    def __init__(self, mode, pq_subvectors=64, pq_centroids=256):
+        if mode not in CompressedGallery.MODES:
+            raise ValueError(f"Unknown gallery quantization: {mode}")
+        self.mode = mode
+        self.pq_subvectors = pq_subvectors
+        self.pq_centroids = min(pq_centroids, 256)
+        self.dim = None
+        self.trained_on = 0
+        self.scale = None
+        self.codebooks = None
+
+    @property
+    def fitted(self):
+        return self.dim is not None
+
+    def compatible(self, mode, dim):
+        return self.fitted and self.mode == mode and self.dim == dim
+
+    def reusable(self, dim, count, train_size):
+        """Whether a gallery of ``count`` rows can keep using this quantizer."""
+        if not self.compatible(self.mode, dim):
+            return False
+        if self.trained_on >= min(count, train_size):
+            return True
+        # codebooks trained on fewer rows than centroids are degenerate
+        if self.mode == 'pq' and self.trained_on < self.pq_centroids:
+            return False
+        return count <= self.trained_on * self.RETRAIN_GROWTH
+
+    def fit(self, sample):
+        """Calibrate on a sample of normalized vectors."""
+        self.dim = sample.shape[1]
+        self.trained_on = len(sample)
+        if self.mode == 'int8':
+            # symmetric per-dimension scale, applied to the query at search time;
+            # values outside the sample's range are clipped when encoding
+            self.scale = np.abs(sample).max(axis=0) / 127.0
+            self.scale[self.scale == 0] = 1.0 / 127.0
+        elif self.mode == 'pq':
+            if self.dim % self.pq_subvectors:
+                raise ValueError(
+                    f"{self.dim}-d embeddings do not split into {self.pq_subvectors} subvectors")
+            self.sub_dim = self.dim // self.pq_subvectors
+            self.codebooks = [
+                _kmeans(sample[:, m * self.sub_dim:(m + 1) * self.sub_dim], self.pq_centroids)
+                for m in range(self.pq_subvectors)
+            ]
+        return self
+
+    def empty_codes(self, count):
+        if self.mode == 'float16':
+            return np.empty((count, self.dim), dtype=np.float16)
+        if self.mode == 'int8':
+            return np.empty((count, self.dim), dtype=np.int8)
+        return np.empty((count, self.pq_subvectors), dtype=np.uint8)
+
+    def encode(self, vectors):
+        if self.mode == 'float16':
+            return vectors.astype(np.float16)
+        if self.mode == 'int8':
+            return np.clip(np.round(vectors / self.scale), -127, 127).astype(np.int8)
+
+        codes = np.empty((len(vectors), self.pq_subvectors), dtype=np.uint8)
+        for m, codebook in enumerate(self.codebooks):
+            part = vectors[:, m * self.sub_dim:(m + 1) * self.sub_dim]
+            distances = -2 * part @ codebook.T + (codebook ** 2).sum(axis=1)
+            codes[:, m] = distances.argmin(axis=1)
+        return codes
+
+    def prepare(self, query):
+        """Per-query state for scoring (scaled query or PQ lookup table)."""
+        if self.mode == 'int8':
+            return query * self.scale
+        if self.mode == 'pq':
+            # asymmetric distance: per-subvector lookup table of query/centroid dot products
+            return np.stack([
+                codebook @ query[m * self.sub_dim:(m + 1) * self.sub_dim]
+                for m, codebook in enumerate(self.codebooks)])
+        return query
+
+    def scores(self, prepared, codes):
+        if self.mode == 'pq':
+            return prepared[np.arange(self.pq_subvectors), codes].sum(axis=1)
+        return codes.astype(np.float32) @ prepared
+
+
+class CompressedGallery:
+    """Gallery searched over compressed codes, re-ranked against exact mmap'd vectors.
+
+    Exact float32 vectors live on disk and are only paged in for the top
+    ``rerank_k`` candidates of the first pass, so resident memory is roughly
+    the size of the codes: 2 bytes/dim for float16, 1 byte/dim for int8 and
+    ``pq_subvectors`` bytes per target for product quantization. build()
+    streams rows in chunks, so the full float32 matrix is never in memory.
+    """
+
+    MODES = ('float16', 'int8', 'pq')
+
+    def __init__(self, names, vectors, codes, quantizer, rerank_k=32, chunk_size=65536):
+        self.names = names
+        self.vectors = vectors
+        self.codes = codes
+        self.quantizer = quantizer
+        self.mode = quantizer.mode
+        self.rerank_k = rerank_k
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def build(cls, rows, count, quantizer, vectors_path, dim=None, rerank_k=32,
+              chunk_size=65536, train_size=65536):
+        """Stream (name, embedding) rows into an mmap'd vector file and resident codes.
+
+        ``count`` is an upper bound on the number of rows, used to size the
+        file up front. Rows whose embedding size differs from ``dim`` (or
+        from the first row, when ``dim`` is None) are skipped. The file is
+        written and mapped under a temporary name, then renamed into place,
+        so neither this gallery nor ones still mapping the previous file can
+        end up reading another build's vectors.
+        """
+        directory = os.path.dirname(vectors_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.npy', dir=directory)
+        os.close(fd)
+
+        names, vectors, codes = [], None, None
+        written = 0
+        try:
+            for chunk_names, chunk in _chunks(rows, min(chunk_size, train_size), dim):
+                chunk = normalize(chunk)
+                if vectors is None:
+                    dim = chunk.shape[1]
+                    if not quantizer.reusable(dim, count, train_size):
+                        # never refit in place: the previous gallery still scores with it
+                        quantizer = Quantizer(
+                            quantizer.mode, quantizer.pq_subvectors, quantizer.pq_centroids
+                        ).fit(chunk)
+                    vectors = np.lib.format.open_memmap(
+                        tmp_path, mode='w+', dtype=np.float32, shape=(max(count, 1), dim))
+                    codes = quantizer.empty_codes(max(count, 1))
+
+                if written + len(chunk) > len(vectors):
+                    # rows added after the count was taken go into the next rebuild
+                    chunk_names = chunk_names[:len(vectors) - written]
+                    chunk = chunk[:len(chunk_names)]
+                end = written + len(chunk)
+                vectors[written:end] = chunk
+                codes[written:end] = quantizer.encode(chunk)
+                names.extend(chunk_names)
+                written = end
+
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(
+                    tmp_path, mode='w+', dtype=np.float32, shape=(0, dim or 0))
+                codes = np.empty((0, 0), dtype=np.float32)
+            vectors.flush()
+            del vectors
+            # map before the rename: a concurrent build may replace vectors_path at any time
+            mapped = np.load(tmp_path, mmap_mode='r')[:written]
+            os.replace(tmp_path, vectors_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return cls(names, mapped, codes[:written], quantizer,
+                   rerank_k=rerank_k, chunk_size=chunk_size)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1] if len(self) else None
+
+    def _approximate_scores(self, query):
+        """First-pass similarity of one normalized query against every code."""
+        prepared = self.quantizer.prepare(query)
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), self.chunk_size):
+            codes = self.codes[start:start + self.chunk_size]
+            scores[start:start + self.chunk_size] = self.quantizer.scores(prepared, codes)
+        return scores
+
+    def candidates(self, query, k):
+        """Indices of the top-k first-pass candidates for one normalized query."""
+        scores = self._approximate_scores(query)
+        k = min(k, len(self))
+        return np.argpartition(-scores, k - 1)[:k]
+
+    def search(self, embeddings, k=1):
+        """Return (indices, similarities) of the k nearest targets per query."""
+        queries = normalize(embeddings)
+        k = min(k, len(self))
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        similarities = np.empty((len(queries), k), dtype=np.float32)
+
+        for i, query in enumerate(queries):
+            candidates = np.sort(self.candidates(query, max(self.rerank_k, k)))
+            exact = self.vectors[candidates] @ query
+            order = np.argsort(-exact)[:k]
+            indices[i] = candidates[order]
+            similarities[i] = exact[order]
+        return indices, similarities
+
+    def match(self, embeddings, threshold):
+        """Return (identity, cosine distance) for each query embedding."""
+        if not len(self) or not len(embeddings):
+            return [('Unknown', 1.0) for _ in range(len(embeddings))]
+
+        indices, similarities = self.search(embeddings, k=1)
+        return [
+            (self.names[idx] if 1.0 - sim <= threshold else 'Unknown', float(1.0 - sim))
+            for idx, sim in zip(indices[:, 0], similarities[:, 0])
+        ]
+
+
+def _chunks(rows, size, dim=None):
+    """Group (name, embedding) rows into (names, float32 matrix) chunks of one size."""
+    names, embeddings = [], []
+    for name, embedding in rows:
+        embedding = np.asarray(embedding, dtype=np.float32)
+        if dim is None:
+            dim = embedding.shape[-1]
+        if embedding.shape[-1] != dim:
+            logger.warning(
+                f"Skipping target {name}: embedding has {embedding.shape[-1]} "
+                f"dims, expected {dim} (re-embed targets for this engine)")
+            continue
+        names.append(name)
+        embeddings.append(embedding)
+        if len(names) == size:
+            yield names, np.stack(embeddings)
+            names, embeddings = [], []
+    if names:
+        yield names, np.stack(embeddings)
+
+
+def build_gallery(rows, count, config, dim=None, previous=None, vectors_path=None):
+    """Build the gallery type selected by GALLERY_QUANTIZATION.
+
+    ``rows`` yields (target_name, embedding) pairs, ideally streamed from the
+    database. The quantizer of ``previous`` is reused when it still fits.
+    """
+    mode = config['GALLERY_QUANTIZATION']
+    if not mode:
+        return Gallery.from_rows(rows, dim=dim)
+
+    quantizer = getattr(previous, 'quantizer', None)
+    if quantizer is None or quantizer.mode != mode:
+        quantizer = Quantizer(
+            mode,
+            pq_subvectors=config['GALLERY_PQ_SUBVECTORS'],
+            pq_centroids=config['GALLERY_PQ_CENTROIDS'])
+
+    return CompressedGallery.build(
+        rows, count, quantizer,
+        vectors_path=vectors_path or config['GALLERY_VECTORS_PATH'],
+        dim=dim,
+        rerank_k=config['GALLERY_RERANK_K'])
+
+
+def _exact_top_k(vectors, queries, k, max_scores=1 << 24):
+    """Indices of the exact top-k rows per query, keeping a running top-k per chunk.
+
+    Only about ``max_scores`` similarities are held at once, so a large
+    probe set against a huge mmap'd gallery never builds the full matrix.
+    """
+    chunk_size = max(max_scores // max(len(queries), 1), k)
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_indices = np.empty((len(queries), 0), dtype=np.int64)
+
+    for start in range(0, len(vectors), chunk_size):
+        scores = queries @ np.asarray(vectors[start:start + chunk_size]).T
+        top = min(k, scores.shape[1])
+        local = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+
+        merged_scores = np.concatenate(
+            [best_scores, np.take_along_axis(scores, local, axis=1)], axis=1)
+        merged_indices = np.concatenate([best_indices, local + start], axis=1)
+        keep = np.argpartition(-merged_scores, min(k, merged_scores.shape[1]) - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        best_indices = np.take_along_axis(merged_indices, keep, axis=1)
+
+    return best_indices
+
+
+def measure_recall(gallery, queries, k=1):
+    """Compare a compressed gallery against exact search over its own vectors.
+
+    Returns recall@k of the re-ranked results and of the first pass alone
+    (whether the exact nearest neighbour survived into the candidate set).
+    Exact neighbours are found chunk by chunk from the mmap'd vectors.
+    """
+    queries = normalize(queries)
+    k = min(k, len(gallery))
+    exact_top = _exact_top_k(gallery.vectors, queries, k)
+
+    found, _ = gallery.search(queries, k=k)
+
+    reranked_hits = sum(
+        len(set(e) & set(f)) for e, f in zip(exact_top, found))
+    first_pass_hits = sum(
+        len(set(e) & set(gallery.candidates(q, gallery.rerank_k)))
+        for e, q in zip(exact_top, queries))
+
+    total = len(queries) * k
+    return {
+        'recall': reranked_hits / total if total else 1.0,
+        'first_pass_recall': first_pass_hits / total if total else 1.0,
+        'queries': len(queries),
+        'k': k,
+        'mode': gallery.mode,
+    }
+
+
+class GallerySnapshot:
+    """Immutable, versioned gallery shared by every StreamMonitor."""
+
+    __slots__ = ('version', 'gallery', 'built_at')
+
+    def __init__(self, version, gallery, built_at):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'gallery', gallery)
+        object.__setattr__(self, 'built_at', built_at)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GallerySnapshot is immutable")
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'targets': len(self.gallery),
+            'built_at': self.built_at.isoformat() if self.built_at else None,
+        }
+
+
+class GalleryStore:
+    """Holds the live gallery snapshot and publishes new ones by reference swap.
+
+    Readers grab ``store.current`` once per batch without locking; rebuilds
+    run on a background thread and replace the reference atomically, so
+    streams pick up target changes on their next frame.
+    """
+
+    def __init__(self):
+        self._snapshot = GallerySnapshot(0, Gallery([], []), None)
+        self._build_lock = threading.RLock()
+        self._state_lock = threading.Lock()
+        self._rebuilding = False
+        self._dirty = False
+
+    @property
+    def current(self):
+        return self._snapshot
+
+    def publish(self, gallery):
+        """Swap in a new snapshot and return it."""
+        with self._state_lock:
+            snapshot = GallerySnapshot(
+                self._snapshot.version + 1, gallery, datetime.datetime.utcnow())
+            self._snapshot = snapshot
+        logger.info(f"Published gallery v{snapshot.version} ({len(gallery)} targets)")
+        return snapshot
+
+    def rebuild(self, app):
+        """Build a gallery from the Target table and publish it."""
+        from app import db
+        from app.models import Target
+        from app.utils.recognition import get_engine
+
+        with self._build_lock, app.app_context():
+            dim = get_engine(app.config).embedding_dim
+            count = db.session.query(db.func.count(Target.id)).scalar()
+            # stream only the needed columns instead of materialising every ORM row
+            rows = (db.session.query(Target.target_name, Target.embedding)
+                    .order_by(Target.id)
+                    .yield_per(app.config['GALLERY_BUILD_CHUNK']))
+            gallery = build_gallery(
+                rows, count, app.config, dim=dim, previous=self._snapshot.gallery)
+            return self.publish(gallery)
+
+    def ensure(self, app):
+        """Build the first snapshot synchronously if none has been published yet."""
+        if self._snapshot.version == 0:
+            with self._build_lock:
+                if self._snapshot.version == 0:
+                    self.rebuild(app)
+        return self._snapshot
+
+    def rebuild_async(self, app):
+        """Schedule a rebuild; requests arriving mid-build coalesce into one more pass."""
+        with self._state_lock:
+            if self._rebuilding:
+                self._dirty = True
+                return
+            self._rebuilding = True
+
+        threading.Thread(
+            target=self._rebuild_loop, args=(app,), name='gallery-rebuild', daemon=True).start()
+
+    def _rebuild_loop(self, app):
+        while True:
+            try:
+                self.rebuild(app)
+            except Exception as e:
+                logger.error(f"Gallery rebuild failed: {str(e)}")
+
+            with self._state_lock:
+                if not self._dirty:
+                    self._rebuilding = False
+                    return
+                self._dirty = False
+
+
+# process-wide live gallery
+gallery_store = GalleryStore()
@@ -10,64 +10,90 @@ logger = logging.getLogger(__name__)
 def get_twilio_client(config):
     """Get a configured Twilio client."""
     return Client(
-        config['TWILIO']['ACCOUNT_SID'],
-        config['TWILIO']['AUTH_TOKEN']
+        config['TWILIO_ACCOUNT_SID'],
+        config['TWILIO_AUTH_TOKEN']
     )
 
 
-def send_email_alert(target_id, timestamp, video_url, notification_contacts, config):
-    """Send email alert when a target is identified."""
-    EMAIL_SENDER = config['EMAIL_SENDER']
-    EMAIL_PASSWORD = config['EMAIL_PASSWORD']
-    EMAIL_SMTP = config['EMAIL_SMTP_SERVER']
-    EMAIL_PORT = int(config['EMAIL_SMTP_PORT'])
-
-    for contact in notification_contacts:
-        if 'email' not in contact:
-            continue
+def _alert_text(target_id, timestamp, video_url, streams):
+    lines = [f"Target individual {target_id} has been identified.",
+             f"Timestamp: {timestamp}"]
+    if streams:
+        lines.append(f"Streams: {', '.join(streams)}")
+    if video_url:
+        lines.append(f"Video: {video_url}")
+    return '\n'.join(lines)
 
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = EMAIL_SENDER
-            msg['To'] = contact['email']
-            msg['Subject'] = f"ALERT: Target {target_id} Identified"
-
-            body = f"""
-            Target individual {target_id} has been identified.
-            Timestamp: {timestamp}
-            Video: {video_url}
-            """
-            msg.attach(MIMEText(body, 'plain'))
-
-            with smtplib.SMTP(EMAIL_SMTP, EMAIL_PORT) as server:
-                server.starttls()
-                server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-                server.send_message(msg)
-
-            logger.info(f"Email alert sent to {contact['email']}")
-        except Exception as e:
-            logger.error(
-                f"Failed to send email to {contact['email']}: {str(e)}")
 
+def send_email(subject, body, notification_contacts, config):
+    """Send one message to every email contact over a single SMTP session."""
+    EMAIL_SENDER = config['EMAIL_SENDER']
+    EMAIL_PASSWORD = config['EMAIL_PASSWORD']
+    EMAIL_SMTP = config['SMTP_SERVER']
+    EMAIL_PORT = int(config['SMTP_PORT'])
+
+    recipients = [contact['email'] for contact in notification_contacts if 'email' in contact]
+    if not recipients:
+        return
+
+    try:
+        with smtplib.SMTP(EMAIL_SMTP, EMAIL_PORT) as server:
+            server.starttls()
+            server.login(EMAIL_SENDER, EMAIL_PASSWORD)
+
+            for recipient in recipients:
+                try:
+                    msg = MIMEMultipart()
+                    msg['From'] = EMAIL_SENDER
+                    msg['To'] = recipient
+                    msg['Subject'] = subject
+                    msg.attach(MIMEText(body, 'plain'))
+
+                    server.send_message(msg)
+                    logger.info(f"Email alert sent to {recipient}")
+                except Exception as e:
+                    logger.error(f"Failed to send email to {recipient}: {str(e)}")
+    except Exception as e:
+        logger.error(f"Failed to connect to SMTP server {EMAIL_SMTP}: {str(e)}")
+
+
+def send_sms(body, notification_contacts, config):
+    """Send one SMS to every phone contact."""
+    recipients = [contact['phone'] for contact in notification_contacts if 'phone' in contact]
+    if not recipients:
+        return
 
-def send_sms_alert(target_id, timestamp, video_url, notification_contacts, config):
-    """Send SMS alert when a target is identified."""
     TWILIO_PHONE = config['TWILIO_PHONE_NUMBER']
     twilio_client = get_twilio_client(config)
 
-    for contact in notification_contacts:
-        if 'phone' not in contact:
-            continue
-
+    for recipient in recipients:
         try:
             message = twilio_client.messages.create(
-                body=f"ALERT: Target {target_id} identified at {timestamp}. Video: {video_url}",
+                body=body,
                 from_=TWILIO_PHONE,
-                to=contact['phone']
+                to=recipient
             )
-            logger.info(f"SMS alert sent to {contact['phone']}: {message.sid}")
+            logger.info(f"SMS alert sent to {recipient}: {message.sid}")
         except Exception as e:
-            logger.error(f"Failed to send SMS to {contact['phone']}: {str(e)}")
+            logger.error(f"Failed to send SMS to {recipient}: {str(e)}")
+
+
+def send_email_alert(target_id, timestamp, video_url, notification_contacts, config, streams=None):
+    """Send email alert when a target is identified."""
+    send_email(
+        f"ALERT: Target {target_id} Identified",
+        _alert_text(target_id, timestamp, video_url, streams),
+        notification_contacts, config)
+
+
+def send_sms_alert(target_id, timestamp, video_url, notification_contacts, config, streams=None):
+    """Send SMS alert when a target is identified."""
+    body = f"ALERT: Target {target_id} identified at {timestamp}."
+    if streams:
+        body += f" Streams: {', '.join(streams)}."
+    if video_url:
+        body += f" Video: {video_url}"
+    send_sms(body, notification_contacts, config)
 
 
 def send_webhook_alert(target_id, timestamp, video_url, config):
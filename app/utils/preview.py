@@ -0,0 +1,76 @@
+import threading
+import time
+import cv2
+
+BOUNDARY = 'frame'
+
+
+class PreviewBroadcaster:
+    """Encode-once MJPEG fan-out of a stream's annotated frames.
+
+    publish() is called from the monitor's process thread. It does nothing
+    while nobody is watching; otherwise it downsizes and JPEG-encodes at most
+    ``max_fps`` frames per second, once, into a shared buffer. Every viewer
+    generator waits for a newer buffer than the one it last sent, so a slow
+    client simply skips frames and never backs up the pipeline.
+    """
+
+    def __init__(self, max_width=640, max_fps=5, quality=70):
+        self.max_width = max_width
+        self.interval = 1.0 / max_fps
+        self.quality = quality
+
+        self.viewers = 0
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._jpeg = None
+        self._last_publish = 0.0
+        self._closed = False
+
+    def publish(self, frame):
+        if not self.viewers:
+            return
+        now = time.monotonic()
+        if now - self._last_publish < self.interval:
+            return
+        self._last_publish = now
+
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            scale = self.max_width / width
+            frame = cv2.resize(
+                frame, (self.max_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+
+        chunk = (f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                 f'Content-Length: {len(buffer)}\r\n\r\n').encode() + buffer.tobytes() + b'\r\n'
+        with self._cond:
+            self._jpeg = chunk
+            self._seq += 1
+            self._cond.notify_all()
+
+    def frames(self, idle_timeout=30):
+        """Yield multipart chunks for one viewer until the stream stops."""
+        with self._cond:
+            self.viewers += 1
+        sent = 0
+        try:
+            while True:
+                with self._cond:
+                    updated = self._cond.wait_for(
+                        lambda: self._closed or self._seq != sent, timeout=idle_timeout)
+                    if self._closed or not updated:
+                        return
+                    sent, chunk = self._seq, self._jpeg
+                yield chunk
+        finally:
+            with self._cond:
+                self.viewers -= 1
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
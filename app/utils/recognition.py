@@ -0,0 +1,313 @@
+import os
+import uuid
+import logging
+import threading
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# one engine instance per backend, shared by every StreamMonitor in the process
+_engines = {}
+_engines_lock = threading.Lock()
+
+# embedding size of each DeepFace model, so stale target rows can be skipped
+DEEPFACE_EMBEDDING_DIMS = {
+    'VGG-Face': 4096,
+    'Facenet': 128,
+    'Facenet512': 512,
+    'OpenFace': 128,
+    'DeepFace': 4096,
+    'DeepID': 160,
+    'ArcFace': 512,
+    'Dlib': 128,
+    'SFace': 128,
+    'GhostFaceNet': 512,
+}
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+class DeepFaceEngine:
+    """Recognition through DeepFace's TensorFlow models (default)."""
+
+    name = 'deepface'
+
+    def __init__(self, config):
+        # imported lazily so the DNN engine never pays for TensorFlow
+        from deepface import DeepFace
+        self.DeepFace = DeepFace
+        self.config = config
+        self.model_name = config['RECOGNITION_MODEL_NAME']
+        self.detector_backend = config['RECOGNITION_DETECTOR_BACKEND']
+        self.min_confidence = config['RECOGNITION_MIN_CONFIDENCE']
+        self.threshold = config['RECOGNITION_THRESHOLD']
+        self.embedding_dim = DEEPFACE_EMBEDDING_DIMS.get(self.model_name)
+
+    def represent(self, img):
+        """Return the embedding of the first face in an image path or array."""
+        return self.DeepFace.represent(
+            img, model_name=self.model_name,
+            detector_backend=self.detector_backend)[0]['embedding']
+
+    def detect(self, frame):
+        """Return face boxes as dicts with x, y, w, h and confidence."""
+        faces = self.DeepFace.extract_faces(
+            frame, detector_backend=self.detector_backend, enforce_detection=False)
+        return [
+            {**face['facial_area'], 'confidence': face['confidence']}
+            for face in faces if face['confidence'] >= self.min_confidence
+        ]
+
+    def find_batch(self, frames, gallery=None):
+        """Embed faces in each frame and match them against the gallery snapshot."""
+        results = []
+        for frame in frames:
+            try:
+                faces = self.DeepFace.represent(
+                    frame,
+                    model_name=self.model_name,
+                    detector_backend=self.detector_backend,
+                    enforce_detection=True,  # Force detection
+                )
+            except ValueError:
+                # raised by DeepFace when no face is detected
+                faces = []
+
+            faces = [f for f in faces if f.get('face_confidence', 1.0) >= self.min_confidence]
+            if not faces:
+                results.append([])
+                continue
+
+            if gallery is not None:
+                matches = gallery.match([f['embedding'] for f in faces], self.threshold)
+            else:
+                matches = [('Unknown', 1.0)] * len(faces)
+
+            results.append([
+                {
+                    'x': face['facial_area']['x'],
+                    'y': face['facial_area']['y'],
+                    'w': face['facial_area']['w'],
+                    'h': face['facial_area']['h'],
+                    'identity': identity,
+                    'distance': distance,
+                }
+                for face, (identity, distance) in zip(faces, matches)
+            ])
+        return results
+
+
+class DnnEngine:
+    """CPU recognition running detector and embedding models through cv2.dnn or ONNX Runtime."""
+
+    name = 'dnn'
+
+    def __init__(self, config):
+        self.config = config
+        self.runtime = config['RECOGNITION_DNN_RUNTIME']
+        self.threads = config['RECOGNITION_DNN_THREADS']
+        self.batch_size = config['RECOGNITION_BATCH_SIZE']
+        self.input_size = tuple(config['RECOGNITION_DNN_INPUT_SIZE'])
+        self.input_layout = config['RECOGNITION_DNN_INPUT_LAYOUT']
+        self.min_confidence = config['RECOGNITION_MIN_CONFIDENCE']
+        self.threshold = config['RECOGNITION_THRESHOLD']
+
+        cv2.setNumThreads(self.threads)
+
+        # cv2.dnn.Net.forward is not thread-safe, monitors share one net
+        self._lock = threading.Lock()
+
+        self.detector = cv2.dnn.readNet(
+            config['RECOGNITION_DNN_DETECTOR_MODEL'],
+            config['RECOGNITION_DNN_DETECTOR_CONFIG'])
+
+        embedding_model = config['RECOGNITION_DNN_EMBEDDING_MODEL']
+        if self.runtime == 'onnxruntime':
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.threads
+            options.inter_op_num_threads = 1
+            self.session = ort.InferenceSession(
+                embedding_model, sess_options=options,
+                providers=['CPUExecutionProvider'])
+            self.input_name = self.session.get_inputs()[0].name
+            self.embedder = None
+        else:
+            self.session = None
+            self.embedder = cv2.dnn.readNetFromONNX(embedding_model)
+
+        # warm-up pass, also tells the gallery which embedding size to expect
+        blank = np.zeros((self.input_size[1], self.input_size[0], 3), dtype=np.uint8)
+        self.embedding_dim = self.embed([blank]).shape[1]
+
+        logger.info(
+            f"Loaded DNN recognition engine ({self.runtime}, {self.threads} threads, "
+            f"{self.embedding_dim}-d embeddings)")
+
+    def detect_batch(self, frames):
+        """Run the SSD face detector over all frames in one blob."""
+        blob = cv2.dnn.blobFromImages(
+            frames, 1.0, (300, 300), (104.0, 177.0, 123.0), swapRB=False, crop=False)
+        with self._lock:
+            self.detector.setInput(blob)
+            detections = self.detector.forward()
+
+        boxes = [[] for _ in frames]
+        # rows are [image_id, class_id, confidence, x1, y1, x2, y2] in relative coords
+        for image_id, _, confidence, x1, y1, x2, y2 in detections[0, 0]:
+            if confidence < self.min_confidence:
+                continue
+            frame_h, frame_w = frames[int(image_id)].shape[:2]
+            x1, y1 = max(int(x1 * frame_w), 0), max(int(y1 * frame_h), 0)
+            x2, y2 = min(int(x2 * frame_w), frame_w), min(int(y2 * frame_h), frame_h)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            boxes[int(image_id)].append({
+                'x': x1, 'y': y1, 'w': x2 - x1, 'h': y2 - y1,
+                'confidence': float(confidence),
+            })
+        return boxes
+
+    def detect(self, frame):
+        return self.detect_batch([frame])[0]
+
+    def embed(self, faces):
+        """Embed face crops in batches of RECOGNITION_BATCH_SIZE."""
+        embeddings = []
+        for start in range(0, len(faces), self.batch_size):
+            chunk = faces[start:start + self.batch_size]
+            blob = cv2.dnn.blobFromImages(
+                chunk, 1.0 / 255, self.input_size, swapRB=True, crop=False)
+            if self.input_layout == 'NHWC':
+                blob = np.ascontiguousarray(blob.transpose(0, 2, 3, 1))
+
+            if self.session is not None:
+                out = self.session.run(None, {self.input_name: blob})[0]
+            else:
+                with self._lock:
+                    self.embedder.setInput(blob)
+                    out = self.embedder.forward()
+            embeddings.append(out.reshape(len(chunk), -1))
+
+        if not embeddings:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(embeddings).astype(np.float32)
+
+    def represent(self, img):
+        """Return the embedding of the most confident face in an image path or array."""
+        if isinstance(img, str):
+            img = cv2.imread(img)
+            if img is None:
+                raise ValueError("Could not read image")
+
+        boxes = self.detect(img)
+        if not boxes:
+            raise ValueError("Face could not be detected")
+        box = max(boxes, key=lambda b: b['confidence'])
+        crop = img[box['y']:box['y'] + box['h'], box['x']:box['x'] + box['w']]
+        return self.embed([crop])[0].tolist()
+
+    def find_batch(self, frames, gallery=None):
+        """Detect, embed and match faces for a batch of frames."""
+        detections = self.detect_batch(frames)
+
+        crops, owners = [], []
+        for frame_idx, (frame, boxes) in enumerate(zip(frames, detections)):
+            for box in boxes:
+                crops.append(frame[box['y']:box['y'] + box['h'], box['x']:box['x'] + box['w']])
+                owners.append((frame_idx, box))
+
+        results = [[] for _ in frames]
+        if not crops:
+            return results
+
+        embeddings = self.embed(crops)
+        if gallery is not None:
+            matches = gallery.match(embeddings, self.threshold)
+        else:
+            matches = [('Unknown', 1.0)] * len(crops)
+
+        for (frame_idx, box), (identity, distance) in zip(owners, matches):
+            results[frame_idx].append({
+                'x': box['x'], 'y': box['y'], 'w': box['w'], 'h': box['h'],
+                'identity': identity,
+                'distance': distance,
+            })
+        return results
+
+
+ENGINES = {
+    DeepFaceEngine.name: DeepFaceEngine,
+    DnnEngine.name: DnnEngine,
+}
+
+
+def get_engine(config):
+    """Return the shared recognition engine selected by RECOGNITION_ENGINE."""
+    name = config['RECOGNITION_ENGINE']
+    if name not in ENGINES:
+        raise ValueError(f"Unknown recognition engine: {name}")
+
+    with _engines_lock:
+        if name not in _engines:
+            _engines[name] = ENGINES[name](config)
+        return _engines[name]
+
+
+def import_target_dir(target_dir):
+    """Add Target rows for images under ``target_dir/<name>/`` that are not tracked yet.
+
+    The DeepFace engine used to match straight against this directory; rows
+    are created with an empty embedding and filled in by reembed_targets().
+    """
+    from app import db
+    from app.models import Target
+
+    if not os.path.isdir(target_dir):
+        return 0
+
+    known = {path for (path,) in db.session.query(Target.target_path)}
+    added = 0
+    for target_name in sorted(os.listdir(target_dir)):
+        person_dir = os.path.join(target_dir, target_name)
+        if not os.path.isdir(person_dir):
+            continue
+        for filename in sorted(os.listdir(person_dir)):
+            target_path = os.path.join(person_dir, filename)
+            if not filename.lower().endswith(IMAGE_EXTENSIONS) or target_path in known:
+                continue
+            db.session.add(Target(target_id=str(uuid.uuid4()), target_name=target_name,
+                                  embedding=[], target_path=target_path))
+            added += 1
+    db.session.commit()
+
+    logger.info(f"Imported {added} targets from {target_dir}")
+    return added
+
+
+def reembed_targets(engine, target_dir=None):
+    """Recompute every Target embedding with the given engine (needs an app context).
+
+    With ``target_dir``, images in that directory are imported as targets first.
+    """
+    from app import db
+    from app.models import Target
+
+    if target_dir:
+        import_target_dir(target_dir)
+
+    updated = 0
+    for target in Target.query.all():
+        try:
+            target.embedding = engine.represent(target.target_path)
+            updated += 1
+        except Exception as e:
+            logger.error(f"Failed to re-embed target {target.target_id}: {str(e)}")
+            if not len(target.embedding):
+                # imported from TARGET_DIR but never embedded, e.g. no face found
+                db.session.delete(target)
+    db.session.commit()
+
+    logger.info(f"Re-embedded {updated} targets with the {engine.name} engine")
+    return updated
@@ -0,0 +1,252 @@
+import os
+import shutil
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# empty sidecar written next to a recording once it is in S3, so restarts
+# do not upload the whole recordings directory again
+UPLOADED_SUFFIX = '.uploaded'
+
+
+class StorageManager:
+    """Quota-bounded local storage for recordings and temp videos.
+
+    Files are tracked in an in-memory index (seeded by one directory scan on
+    first use) instead of rescanning the disk. A background thread uploads
+    finished recordings to S3 and evicts the oldest uploaded files when a
+    stream or the node goes over quota; files that never made it to S3 are
+    only evicted once the hard quota is reached.
+
+    Monitors ask evidence_mode_for() before recording: past the soft limit
+    video is downgraded to keyframes, at the hard limit nothing new is
+    recorded until eviction catches up.
+    """
+
+    OK = 'ok'
+    SOFT = 'soft'
+    HARD = 'hard'
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._started = False
+
+        self._files = {}               # path -> entry dict
+        self._stream_bytes = {}        # stream_id -> bytes
+        self._total_bytes = 0
+        self._uploads = []             # paths waiting for upload
+
+    def init_app(self, app):
+        self.app = app
+        config = app.config
+        self.recordings_dir = config['STORAGE_RECORDINGS_DIR']
+        self.temp_dir = config['TEMP_VIDEO_DIR']
+        self.global_quota = config['STORAGE_GLOBAL_QUOTA_MB'] * MB
+        self.stream_quota = config['STORAGE_STREAM_QUOTA_MB'] * MB
+        self.soft_limit = config['STORAGE_SOFT_LIMIT']
+        self.min_free = config['STORAGE_MIN_FREE_MB'] * MB
+        self.temp_max_age = config['STORAGE_TEMP_MAX_AGE']
+        self.upload_to_s3 = config['STORAGE_UPLOAD_TO_S3']
+
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self._scan()
+        self._thread = threading.Thread(target=self._run, name='storage-manager', daemon=True)
+        self._thread.start()
+
+    def _scan(self):
+        """Seed the index from what is already on disk (once per process)."""
+        os.makedirs(self.recordings_dir, exist_ok=True)
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+        for stream_id in os.listdir(self.recordings_dir):
+            stream_dir = os.path.join(self.recordings_dir, stream_id)
+            if os.path.isdir(stream_dir):
+                for name in os.listdir(stream_dir):
+                    if name.endswith(UPLOADED_SUFFIX):
+                        continue
+                    path = os.path.join(stream_dir, name)
+                    uploaded = os.path.exists(path + UPLOADED_SUFFIX)
+                    if self._add(path, stream_id, 'recordings', uploaded=uploaded) \
+                            and self.upload_to_s3 and not uploaded:
+                        self._uploads.append(path)
+        for name in os.listdir(self.temp_dir):
+            self._add(os.path.join(self.temp_dir, name), None, 'temp', uploaded=False)
+
+        logger.info(f"Storage index seeded: {len(self._files)} files, "
+                    f"{self._total_bytes / MB:.1f} MB")
+
+    def _add(self, path, stream_id, area, uploaded):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        with self._lock:
+            self._discard(path)
+            self._files[path] = {
+                'size': stat.st_size, 'stream_id': stream_id, 'area': area,
+                'created': stat.st_mtime, 'uploaded': uploaded,
+            }
+            self._total_bytes += stat.st_size
+            if stream_id is not None:
+                self._stream_bytes[stream_id] = self._stream_bytes.get(stream_id, 0) + stat.st_size
+        return True
+
+    def _discard(self, path):
+        """Drop a path from the index; caller holds the lock."""
+        entry = self._files.pop(path, None)
+        if entry is None:
+            return None
+        self._total_bytes -= entry['size']
+        if entry['stream_id'] is not None:
+            self._stream_bytes[entry['stream_id']] -= entry['size']
+        return entry
+
+    def register(self, path, stream_id=None, area='recordings'):
+        """Track a finished file; recordings are queued for upload."""
+        self._ensure_started()
+        if not self._add(path, stream_id, area, uploaded=False):
+            return
+        if area == 'recordings' and self.upload_to_s3:
+            with self._lock:
+                self._uploads.append(path)
+        self._wake.set()
+
+    def remove(self, path):
+        """Delete a tracked file now (e.g. a processed temp video)."""
+        with self._lock:
+            self._discard(path)
+        for stale in (path, path + UPLOADED_SUFFIX):
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+    def pressure(self, stream_id=None):
+        """'ok', 'soft' or 'hard' for the node, or for one stream's quota."""
+        self._ensure_started()
+        used = self._total_bytes / self.global_quota if self.global_quota else 0.0
+        if stream_id is not None and self.stream_quota:
+            used = max(used, self._stream_bytes.get(stream_id, 0) / self.stream_quota)
+
+        try:
+            free = shutil.disk_usage(self.recordings_dir).free
+        except OSError:
+            free = None
+
+        if used >= 1.0 or (free is not None and free < self.min_free):
+            return self.HARD
+        if used >= self.soft_limit or (free is not None and free < 2 * self.min_free):
+            return self.SOFT
+        return self.OK
+
+    def evidence_mode_for(self, stream_id, mode):
+        """Evidence mode a stream may use right now, or None to skip recording."""
+        pressure = self.pressure(stream_id)
+        if pressure == self.HARD:
+            self._wake.set()
+            return None
+        if pressure == self.SOFT and mode == 'video':
+            return 'keyframes'
+        return mode
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=30)
+            self._wake.clear()
+            try:
+                self._upload_pending()
+            except Exception as e:
+                logger.error(f"Storage upload error: {str(e)}")
+            try:
+                self._evict()
+            except Exception as e:
+                logger.error(f"Storage eviction error: {str(e)}")
+
+    def _upload_pending(self):
+        from app.utils.storage import upload_to_s3
+
+        with self._lock:
+            pending, self._uploads = self._uploads, []
+
+        for path in pending:
+            entry = self._files.get(path)
+            if entry is None:
+                continue
+            object_name = f"{entry['stream_id']}/{os.path.basename(path)}"
+            try:
+                with self.app.app_context():
+                    url = upload_to_s3(path, object_name=object_name)
+            except Exception as e:
+                logger.error(f"Failed to upload {path}: {str(e)}")
+                url = None
+            if url:
+                entry['uploaded'] = True
+                try:
+                    open(path + UPLOADED_SUFFIX, 'w').close()
+                except OSError as e:
+                    logger.warning(f"Could not mark {path} as uploaded: {str(e)}")
+            else:
+                # retried on the next pass
+                with self._lock:
+                    self._uploads.append(path)
+
+    def _evict(self):
+        now = time.time()
+        with self._lock:
+            entries = sorted(self._files.items(), key=lambda item: item[1]['created'])
+
+        victims = []
+        for path, entry in entries:
+            if entry['area'] == 'temp' and now - entry['created'] > self.temp_max_age:
+                victims.append(path)
+
+        # over quota: oldest uploaded files first, then unuploaded ones once past the hard limit
+        over_global = self._total_bytes - self.global_quota * self.soft_limit
+        over_stream = {
+            stream_id: used - self.stream_quota * self.soft_limit
+            for stream_id, used in self._stream_bytes.items()
+        }
+        # with uploads off nothing will ever be uploaded, so every file is fair game
+        global_hard = self.pressure() == self.HARD
+        stream_hard = {}
+        for allow_unuploaded in (False, True):
+            for path, entry in entries:
+                if path in victims or entry['area'] != 'recordings':
+                    continue
+                stream_id = entry['stream_id']
+                if over_global <= 0 and over_stream.get(stream_id, 0) <= 0:
+                    continue
+                if not entry['uploaded'] and self.upload_to_s3:
+                    if not allow_unuploaded:
+                        continue
+                    # only past a hard limit, the node's or this stream's own
+                    if stream_id not in stream_hard:
+                        stream_hard[stream_id] = self.pressure(stream_id) == self.HARD
+                    if not (global_hard or stream_hard[stream_id]):
+                        continue
+                    logger.warning(f"Evicting {path} before it was uploaded")
+                victims.append(path)
+                over_global -= entry['size']
+                over_stream[stream_id] = over_stream.get(stream_id, 0) - entry['size']
+
+        for path in victims:
+            self.remove(path)
+        if victims:
+            logger.info(f"Evicted {len(victims)} files, {self._total_bytes / MB:.1f} MB in use")
+
+
+# process-wide storage manager, bound to the app in create_app
+storage_manager = StorageManager()
@@ -0,0 +1,51 @@
+import numpy as np
+
+
+def to_pixels(rect, frame_w, frame_h):
+    """Convert a relative [x, y, w, h] rect to clipped pixel (x1, y1, x2, y2)."""
+    x, y, w, h = rect
+    x1, y1 = max(int(x * frame_w), 0), max(int(y * frame_h), 0)
+    x2, y2 = min(int((x + w) * frame_w), frame_w), min(int((y + h) * frame_h), frame_h)
+    return x1, y1, x2, y2
+
+
+def crop_regions(frame, regions):
+    """Cut a frame into detection crops according to a stream's regions.
+
+    Returns a list of (crop, (offset_x, offset_y)). Without include regions
+    the whole frame is one crop. Excluded areas are blanked inside the crops;
+    crops are only copied when an exclusion touches them, so the original
+    frame (which gets annotated and recorded) is never modified.
+    """
+    frame_h, frame_w = frame.shape[:2]
+    regions = regions or {}
+    includes = regions.get('include') or [[0.0, 0.0, 1.0, 1.0]]
+    excludes = [to_pixels(r, frame_w, frame_h) for r in regions.get('exclude') or []]
+
+    crops = []
+    for rect in includes:
+        x1, y1, x2, y2 = to_pixels(rect, frame_w, frame_h)
+        if x2 <= x1 or y2 <= y1:
+            continue
+
+        crop = frame[y1:y2, x1:x2]
+        overlapping = [
+            (ex1, ey1, ex2, ey2) for ex1, ey1, ex2, ey2 in excludes
+            if ex1 < x2 and ex2 > x1 and ey1 < y2 and ey2 > y1
+        ]
+        if overlapping:
+            crop = np.ascontiguousarray(crop).copy()
+            for ex1, ey1, ex2, ey2 in overlapping:
+                crop[max(ey1 - y1, 0):max(ey2 - y1, 0), max(ex1 - x1, 0):max(ex2 - x1, 0)] = 0
+
+        crops.append((crop, (x1, y1)))
+    return crops
+
+
+def offset_matches(matches, offset):
+    """Map match boxes found in a crop back to frame coordinates."""
+    offset_x, offset_y = offset
+    return [
+        {**match, 'x': match['x'] + offset_x, 'y': match['y'] + offset_y}
+        for match in matches
+    ]
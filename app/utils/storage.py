@@ -19,8 +19,9 @@ def get_s3_client():
 
 def ensure_directories():
     """Create necessary directories if they don't exist."""
-    os.makedirs('targets', exist_ok=True)
-    os.makedirs('temp_videos', exist_ok=True)
+    os.makedirs(app.config['TARGET_DIR'], exist_ok=True)
+    os.makedirs(app.config['TEMP_VIDEO_DIR'], exist_ok=True)
+    os.makedirs(app.config['STORAGE_RECORDINGS_DIR'], exist_ok=True)
 
 
 def upload_to_s3(file_path, object_name=None, config=None):
@@ -0,0 +1,54 @@
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session
+
+# Per-table change counters used for ETags. They live in the table_version
+# table and are bumped inside the same transaction as the change itself, so
+# every worker process sees the same version and a version is never handed
+# out for data that could still roll back.
+VERSION_TABLE = 'table_version'
+
+
+def get_version(table, session=None):
+    from app import db
+    from app.models import TableVersion
+
+    session = session or db.session
+    version = (session.query(TableVersion.version)
+               .filter(TableVersion.table_name == table)
+               .scalar())
+    return version or 0
+
+
+def etag_for(table, *parts):
+    """ETag for a view of a table; parts distinguish pages and query options."""
+    suffix = '-'.join(str(p) for p in parts)
+    return f"{table}-{get_version(table)}-{suffix}"
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_changed_tables(session, flush_context):
+    from app.models import TableVersion
+
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table and table != VERSION_TABLE:
+            changed.add(table)
+
+    # once per transaction is enough: other sessions only see it after commit
+    bumped = session.info.setdefault('bumped_tables', set())
+    connection = session.connection()
+    for table in changed - bumped:
+        result = connection.execute(
+            update(TableVersion)
+            .where(TableVersion.table_name == table)
+            .values(version=TableVersion.version + 1))
+        if not result.rowcount:
+            connection.execute(insert(TableVersion).values(table_name=table, version=1))
+        bumped.add(table)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _reset_bumped_tables(session):
+    session.info.pop('bumped_tables', None)
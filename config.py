@@ -36,7 +36,71 @@ class Config:
     RECOGNITION_THRESHOLD = 0.35
     RECOGNITION_FRAME_RATE = 30
 
+    # Recognition Engine ("deepface" or "dnn")
+    RECOGNITION_ENGINE = os.getenv("RECOGNITION_ENGINE", "deepface")
+    RECOGNITION_BATCH_SIZE = 8
+    RECOGNITION_DNN_RUNTIME = "opencv"  # "opencv" or "onnxruntime"
+    RECOGNITION_DNN_THREADS = 4
+    RECOGNITION_DNN_DETECTOR_MODEL = "models/res10_300x300_ssd_iter_140000.caffemodel"
+    RECOGNITION_DNN_DETECTOR_CONFIG = "models/deploy.prototxt"
+    RECOGNITION_DNN_EMBEDDING_MODEL = "models/vgg_face.onnx"
+    RECOGNITION_DNN_INPUT_SIZE = (224, 224)
+    RECOGNITION_DNN_INPUT_LAYOUT = "NHWC"  # TensorFlow exports are channels-last
+
+    # Capture Settings ("opencv" or "ffmpeg"; fps/size only apply to ffmpeg)
+    CAPTURE_BACKEND = os.getenv("CAPTURE_BACKEND", "opencv")
+    CAPTURE_FPS = 5
+    CAPTURE_WIDTH = 960
+    CAPTURE_HEIGHT = None  # derived from the source aspect ratio
+    FFMPEG_PATH = "ffmpeg"
+    FFPROBE_PATH = "ffprobe"
+    CAPTURE_IO_TIMEOUT = 10  # seconds a stalled network source may block a read
+    STREAM_CONNECT_WORKERS = 16  # captures opened concurrently in the background
+
+    # Evidence Settings ("video" for continuous mp4, "keyframes" for crops + keyframes)
+    EVIDENCE_MODE = os.getenv("EVIDENCE_MODE", "video")
+    EVIDENCE_KEYFRAME_INTERVAL = 1.0  # seconds between samples per event
+    EVIDENCE_MAX_KEYFRAMES = 30  # per event
+    EVIDENCE_IMAGE_FORMAT = "jpg"  # "jpg" or "webp"
+    EVIDENCE_IMAGE_QUALITY = 85
+
+    # Live Preview
+    PREVIEW_MAX_WIDTH = 640
+    PREVIEW_MAX_FPS = 5
+    PREVIEW_JPEG_QUALITY = 70
+
+    # Local Storage Retention
+    STORAGE_RECORDINGS_DIR = "recordings"
+    STORAGE_GLOBAL_QUOTA_MB = 20480  # recordings + temp videos on this node
+    STORAGE_STREAM_QUOTA_MB = 2048
+    STORAGE_SOFT_LIMIT = 0.8  # fraction of quota where video drops to keyframes
+    STORAGE_MIN_FREE_MB = 1024
+    STORAGE_TEMP_MAX_AGE = 3600  # seconds before stray temp videos are removed
+    STORAGE_UPLOAD_TO_S3 = os.getenv("STORAGE_UPLOAD_TO_S3", "true").lower() == "true"
+
+    # Gallery Settings (quantization: None, "float16", "int8" or "pq")
+    GALLERY_QUANTIZATION = os.getenv("GALLERY_QUANTIZATION")
+    GALLERY_VECTORS_PATH = "gallery/vectors.npy"
+    GALLERY_RERANK_K = 32
+    GALLERY_PQ_SUBVECTORS = 64
+    GALLERY_PQ_CENTROIDS = 256
+    GALLERY_BUILD_CHUNK = 10000  # rows streamed from the database per chunk
+
+    # Alerting
+    ALERT_COOLDOWN_SECONDS = 300  # per target and stream
+    ALERT_MERGE_WINDOW_SECONDS = 10  # sightings on other streams join the same alert
+    ALERT_DIGEST_INTERVAL_SECONDS = 0  # 0 disables digests
+    ALERT_MAX_PER_MINUTE = 6
+
+    # Database (SQLite pragmas apply only to sqlite:// URIs)
+    SQLITE_SYNCHRONOUS = "NORMAL"  # safe with WAL, far fewer fsyncs than FULL
+    SQLITE_CACHE_SIZE_KB = 65536
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+    DB_BATCH_SIZE = 100  # rows per commit from background writers
+    DB_BATCH_INTERVAL = 1.0  # max seconds a queued row waits for its commit
+
     # Contacts
+    CONTACT_DIRECTORY_TTL = 60  # seconds before the cached directory is reloaded
     CONTACTS = {
         "emails": ["security@yourcompany.com", "admin@yourcompany.com"],
         "phones": ["+15551234567", "+15557654321"],
@@ -48,6 +112,15 @@ class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///localdb.sqlite'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 10,
+        "pool_pre_ping": True,
+        # pooled connections are shared by API and monitor threads; the lock
+        # wait is set by SQLITE_BUSY_TIMEOUT_MS, not the driver's timeout
+        "connect_args": {"check_same_thread": False},
+    }
 
 
 class ProductionConfig(Config):
@@ -55,7 +128,14 @@ class ProductionConfig(Config):
     DEBUG = False
 
 
+class LoadTestConfig(DevelopmentConfig):
+    """Configuration for tools/loadtest.py (separate database)"""
+    DEBUG = False
+    SQLALCHEMY_DATABASE_URI = os.getenv("LOADTEST_DATABASE_URI", 'sqlite:///loadtest.sqlite')
+
+
 config_dict = {
     "development": DevelopmentConfig,
     "production": ProductionConfig,
+    "loadtest": LoadTestConfig,
 }
@@ -0,0 +1,80 @@
+from unittest import mock
+
+import pytest
+
+from app.utils import alerts
+from app.utils.alerts import AlertCorrelator
+
+
+class FakeApp:
+    config = {}
+
+
+@pytest.fixture
+def correlator():
+    correlator = AlertCorrelator(cooldown=300, merge_window=0, digest_interval=0, max_per_minute=2)
+    correlator.app = FakeApp()
+    # keep sending on the test thread
+    correlator._ensure_worker = lambda: None
+    return correlator
+
+
+@pytest.fixture
+def sent():
+    calls = []
+    with mock.patch.object(alerts, 'send_email_alert', lambda target, *a, **kw: calls.append(('email', target, kw['streams']))), \
+            mock.patch.object(alerts, 'send_sms_alert', lambda target, *a, **kw: calls.append(('sms', target, kw['streams']))), \
+            mock.patch.object(alerts.contact_directory, 'recipients', lambda channel: ()):
+        yield calls
+
+
+def test_cooldown_suppresses_repeat_sightings(correlator, sent):
+    assert correlator.record('nick', 'cam-1')
+    assert not correlator.record('nick', 'cam-1')
+    assert correlator.record('nick', 'cam-2')
+
+    correlator._flush()
+
+    assert sent == [('email', 'nick', ['cam-1', 'cam-2']), ('sms', 'nick', ['cam-1', 'cam-2'])]
+
+
+def test_merge_window_holds_the_group(correlator, sent):
+    correlator.merge_window = 60
+    correlator.record('nick', 'cam-1')
+
+    correlator._flush()
+
+    assert sent == []
+    assert 'nick' in correlator._pending
+
+
+def test_over_budget_groups_stay_pending(correlator, sent):
+    for target in ('a', 'b', 'c'):
+        correlator.record(target, 'cam-1')
+
+    correlator._flush()
+
+    assert {target for _, target, _ in sent} == {'a', 'b'}
+    assert list(correlator._pending) == ['c']
+
+    # the budget frees up a minute later
+    correlator._sent.clear()
+    correlator._flush()
+
+    assert ('email', 'c', ['cam-1']) in sent
+    assert correlator._pending == {}
+
+
+def test_failing_channel_does_not_block_the_other(correlator):
+    calls = []
+
+    def broken_email(*args, **kwargs):
+        raise RuntimeError('smtp down')
+
+    with mock.patch.object(alerts, 'send_email_alert', broken_email), \
+            mock.patch.object(alerts, 'send_sms_alert', lambda target, *a, **kw: calls.append(target)), \
+            mock.patch.object(alerts.contact_directory, 'recipients', lambda channel: ()):
+        correlator.record('nick', 'cam-1')
+        correlator._flush()
+
+    assert calls == ['nick']
@@ -0,0 +1,45 @@
+import stat
+import threading
+
+from app.utils.capture import FFmpegCapture, network_input_args, parse_source
+
+
+def test_parse_source():
+    assert parse_source('0') == 0
+    assert parse_source('rtsp://camera/1') == 'rtsp://camera/1'
+
+
+def test_network_sources_get_a_socket_timeout():
+    assert network_input_args('rtsp://camera/1', 10) == [
+        '-rtsp_transport', 'tcp', '-timeout', '10000000']
+    assert network_input_args('http://camera/video.mjpg', 2.5) == ['-rw_timeout', '2500000']
+    assert network_input_args('/videos/clip.mp4', 10) == []
+    assert network_input_args('rtsp://camera/1') == ['-rtsp_transport', 'tcp']
+
+
+def stalled_ffmpeg(tmp_path):
+    """A stand-in for ffmpeg that connects and then never sends a frame."""
+    path = tmp_path / 'ffmpeg'
+    path.write_text('#!/bin/sh\nexec sleep 60\n')
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def test_interrupt_unblocks_a_stalled_read(tmp_path):
+    cap = FFmpegCapture('rtsp://camera/1', width=64, height=48,
+                        ffmpeg_path=stalled_ffmpeg(tmp_path), io_timeout=10)
+    assert cap.isOpened()
+
+    result = []
+    reader = threading.Thread(target=lambda: result.append(cap.read()))
+    reader.start()
+    reader.join(timeout=0.2)
+    assert reader.is_alive()
+
+    cap.interrupt()
+    reader.join(timeout=5)
+
+    assert not reader.is_alive()
+    assert result == [(False, None)]
+    cap.release()
+    assert not cap.isOpened()
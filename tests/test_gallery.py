@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+
+from app.utils.gallery import CompressedGallery, Gallery, Quantizer, build_gallery, measure_recall
+
+
+def make_rows(count=500, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.normal(size=(count, dim)).astype(np.float32)
+    return [(f"target-{i}", embeddings[i]) for i in range(count)], embeddings
+
+
+def make_config(tmp_path, mode):
+    return {
+        'GALLERY_QUANTIZATION': mode,
+        'GALLERY_VECTORS_PATH': str(tmp_path / 'vectors.npy'),
+        'GALLERY_RERANK_K': 32,
+        'GALLERY_PQ_SUBVECTORS': 16,
+        'GALLERY_PQ_CENTROIDS': 64,
+    }
+
+
+@pytest.mark.parametrize('mode', CompressedGallery.MODES)
+def test_search_finds_noisy_targets(tmp_path, mode):
+    rows, embeddings = make_rows()
+    gallery = build_gallery(iter(rows), len(rows), make_config(tmp_path, mode))
+
+    rng = np.random.default_rng(1)
+    queries = embeddings[:50] + rng.normal(0, 0.05, (50, embeddings.shape[1])).astype(np.float32)
+    indices, similarities = gallery.search(queries, k=3)
+
+    assert indices.shape == (50, 3)
+    assert (indices[:, 0] == np.arange(50)).all()
+    assert (np.diff(similarities, axis=1) <= 1e-6).all()
+
+
+@pytest.mark.parametrize('mode', CompressedGallery.MODES)
+def test_measure_recall(tmp_path, mode):
+    rows, embeddings = make_rows()
+    gallery = build_gallery(iter(rows), len(rows), make_config(tmp_path, mode))
+
+    result = measure_recall(gallery, embeddings[:100], k=1)
+
+    assert result['mode'] == mode
+    assert result['queries'] == 100
+    assert result['recall'] == 1.0
+    assert 0.0 <= result['first_pass_recall'] <= 1.0
+
+
+def test_match_applies_threshold(tmp_path):
+    rows, embeddings = make_rows()
+    gallery = build_gallery(iter(rows), len(rows), make_config(tmp_path, 'int8'))
+
+    matches = gallery.match([embeddings[7], -embeddings[7]], threshold=0.35)
+
+    assert matches[0][0] == 'target-7'
+    assert matches[1][0] == 'Unknown'
+
+
+def test_skips_embeddings_of_another_size(tmp_path):
+    rows, _ = make_rows(count=20)
+    rows.append(('stale', np.ones(128, dtype=np.float32)))
+    gallery = build_gallery(iter(rows), len(rows), make_config(tmp_path, 'float16'), dim=64)
+
+    assert len(gallery) == 20
+    assert 'stale' not in gallery.names
+    assert gallery.vectors.shape == (20, 64)
+
+
+def test_rebuild_reuses_quantizer(tmp_path):
+    config = make_config(tmp_path, 'pq')
+    rows, _ = make_rows()
+    first = build_gallery(iter(rows), len(rows), config)
+    second = build_gallery(iter(rows[:100]), 100, config, previous=first)
+
+    assert second.quantizer is first.quantizer
+    # the first gallery keeps serving from its own (replaced) vector file
+    assert first.match([rows[300][1]], threshold=0.1)[0][0] == 'target-300'
+
+
+def test_incompatible_quantizer_is_not_refitted_in_place(tmp_path):
+    config = make_config(tmp_path, 'int8')
+    rows, _ = make_rows(dim=64)
+    first = build_gallery(iter(rows), len(rows), config)
+    other_rows, _ = make_rows(dim=32)
+    second = build_gallery(iter(other_rows), len(other_rows), config, previous=first)
+
+    assert second.quantizer is not first.quantizer
+    assert first.quantizer.dim == 64
+
+
+def test_empty_gallery(tmp_path):
+    gallery = build_gallery(iter([]), 0, make_config(tmp_path, 'int8'))
+
+    assert len(gallery) == 0
+    assert gallery.match([np.ones(64)], threshold=0.35) == [('Unknown', 1.0)]
+
+
+def test_exact_gallery_from_rows():
+    rows, embeddings = make_rows(count=10)
+    gallery = Gallery.from_rows(rows)
+
+    assert gallery.dim == 64
+    assert gallery.match([embeddings[3]], threshold=0.35)[0][0] == 'target-3'
+
+
+def test_unknown_quantization():
+    with pytest.raises(ValueError):
+        Quantizer('int4')
+
+
+def test_quantizer_is_retrained_once_the_gallery_outgrows_it(tmp_path):
+    config = make_config(tmp_path, 'pq')
+    rows, embeddings = make_rows(count=3000)
+    small = build_gallery(iter(rows[:3]), 3, config)
+    grown = build_gallery(iter(rows), len(rows), config, previous=small)
+
+    assert grown.quantizer is not small.quantizer
+    assert grown.quantizer.trained_on == len(rows)
+    assert measure_recall(grown, embeddings[:200])['recall'] == 1.0
+
+
+def test_quantizer_reuse_rules():
+    quantizer = Quantizer('pq', pq_subvectors=8, pq_centroids=64)
+    quantizer.fit(np.random.default_rng(0).normal(size=(100, 64)).astype(np.float32))
+
+    assert quantizer.reusable(64, 150, train_size=65536)
+    assert not quantizer.reusable(64, 250, train_size=65536)
+    assert not quantizer.reusable(32, 100, train_size=65536)
+    # trained on a full sample: reused however large the gallery gets
+    assert quantizer.reusable(64, 10 ** 6, train_size=100)
+
+
+def test_measure_recall_does_not_depend_on_chunking(tmp_path, monkeypatch):
+    from app.utils import gallery as gallery_module
+
+    rows, embeddings = make_rows()
+    gallery = build_gallery(iter(rows), len(rows), make_config(tmp_path, 'float16'))
+    expected = measure_recall(gallery, embeddings[:20], k=5)
+
+    original = gallery_module._exact_top_k
+    monkeypatch.setattr(
+        gallery_module, '_exact_top_k',
+        lambda vectors, queries, k: original(vectors, queries, k, max_scores=len(queries) * 7))
+
+    assert measure_recall(gallery, embeddings[:20], k=5) == expected
+
+
+def test_gallery_keeps_its_vectors_when_the_file_is_replaced(tmp_path):
+    config = make_config(tmp_path, 'int8')
+    rows, embeddings = make_rows()
+    first = build_gallery(iter(rows), len(rows), config)
+    other_rows, _ = make_rows(seed=5)
+    build_gallery(iter(other_rows), len(other_rows), config)
+
+    assert np.allclose(first.vectors[0], embeddings[0] / np.linalg.norm(embeddings[0]), atol=1e-6)
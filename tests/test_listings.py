@@ -0,0 +1,92 @@
+import pytest
+
+import config
+from app import create_app, db
+from app.models import Contact
+from app.utils.database import worker_session
+from app.utils.versions import get_version
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        config.LoadTestConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'test.sqlite'}")
+    app = create_app('loadtest')
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def add_contact(client, name):
+    response = client.post('/api/add_contact', json={
+        'contact_name': name, 'contact_email': f"{name}@example.com"})
+    assert response.status_code == 201
+
+
+def test_unchanged_listing_is_not_modified(client):
+    first = client.get('/api/contacts')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    again = client.get('/api/contacts', headers={'If-None-Match': etag})
+
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+
+
+def test_write_changes_the_etag(client):
+    etag = client.get('/api/contacts').headers['ETag']
+
+    add_contact(client, 'alice')
+    response = client.get('/api/contacts', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert [c['contact_name'] for c in response.json] == ['alice']
+
+
+def test_version_is_shared_through_the_database(app):
+    with app.app_context():
+        before = get_version('contact')
+
+    # a session outside Flask-SQLAlchemy, like another worker process would use
+    with worker_session(app) as session:
+        session.add(Contact(contact_name='bob', contact_email='bob@example.com', active=True))
+
+    with app.app_context():
+        assert get_version('contact') == before + 1
+
+
+def test_rolled_back_changes_do_not_bump(app):
+    with app.app_context():
+        before = get_version('contact')
+        db.session.add(Contact(contact_name='carol', contact_email='carol@example.com', active=True))
+        db.session.flush()
+        db.session.rollback()
+
+        assert get_version('contact') == before
+
+
+def test_link_header_pages_through_the_listing(client):
+    for name in ('alice', 'bob', 'carol'):
+        add_contact(client, name)
+
+    first = client.get('/api/contacts?limit=2')
+    assert [c['contact_name'] for c in first.json] == ['alice', 'bob']
+    next_url = first.headers['Link'].split(';')[0].strip('<>')
+    assert 'after=2' in next_url and 'limit=2' in next_url
+
+    second = client.get(next_url)
+    assert [c['contact_name'] for c in second.json] == ['carol']
+    assert 'Link' not in second.headers
+    assert second.headers['ETag'] != first.headers['ETag']
+
+
+def test_invalid_pagination(client):
+    assert client.get('/api/contacts?limit=abc').status_code == 400
+    assert client.get('/api/contacts?after=-1').status_code == 400
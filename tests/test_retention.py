@@ -0,0 +1,172 @@
+import contextlib
+import os
+
+import pytest
+
+from app.utils.retention import MB, UPLOADED_SUFFIX, StorageManager
+
+
+class FakeApp:
+    def __init__(self, tmp_path, **overrides):
+        self.config = {
+            'STORAGE_RECORDINGS_DIR': str(tmp_path / 'recordings'),
+            'TEMP_VIDEO_DIR': str(tmp_path / 'temp'),
+            'STORAGE_GLOBAL_QUOTA_MB': 100,
+            'STORAGE_STREAM_QUOTA_MB': 2,
+            'STORAGE_SOFT_LIMIT': 0.8,
+            'STORAGE_MIN_FREE_MB': 0,
+            'STORAGE_TEMP_MAX_AGE': 3600,
+            'STORAGE_UPLOAD_TO_S3': False,
+            **overrides,
+        }
+
+
+def make_manager(tmp_path, **overrides):
+    manager = StorageManager()
+    manager.init_app(FakeApp(tmp_path, **overrides))
+    # index the disk without starting the background thread
+    manager._started = True
+    manager._scan()
+    return manager
+
+
+def write_recording(manager, stream_id, name, size_mb, mtime):
+    stream_dir = os.path.join(manager.recordings_dir, stream_id)
+    os.makedirs(stream_dir, exist_ok=True)
+    path = os.path.join(stream_dir, name)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * int(size_mb * MB))
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_pressure_levels(tmp_path):
+    manager = make_manager(tmp_path)
+    assert manager.pressure('cam-1') == manager.OK
+
+    manager._add(write_recording(manager, 'cam-1', 'a.mp4', 1.7, 1), 'cam-1', 'recordings', False)
+    assert manager.pressure('cam-1') == manager.SOFT
+    assert manager.evidence_mode_for('cam-1', 'video') == 'keyframes'
+
+    manager._add(write_recording(manager, 'cam-1', 'b.mp4', 0.5, 2), 'cam-1', 'recordings', False)
+    assert manager.pressure('cam-1') == manager.HARD
+    assert manager.evidence_mode_for('cam-1', 'video') is None
+    # the node as a whole is far from its quota
+    assert manager.pressure() == manager.OK
+
+
+def test_stream_over_quota_recovers_without_uploads(tmp_path):
+    manager = make_manager(tmp_path)
+    for i in range(3):
+        manager._add(write_recording(manager, 'cam-1', f"{i}.mp4", 1, i), 'cam-1', 'recordings', False)
+    assert manager.evidence_mode_for('cam-1', 'video') is None
+
+    manager._evict()
+
+    # oldest first, down to the soft line
+    remaining = sorted(os.listdir(os.path.join(manager.recordings_dir, 'cam-1')))
+    assert remaining == ['2.mp4']
+    assert manager.evidence_mode_for('cam-1', 'video') == 'video'
+
+
+def test_unuploaded_files_evicted_only_when_stream_is_hard(tmp_path):
+    manager = make_manager(tmp_path, STORAGE_UPLOAD_TO_S3=True)
+    manager._add(write_recording(manager, 'cam-1', 'a.mp4', 1.7, 1), 'cam-1', 'recordings', False)
+
+    manager._evict()
+    assert manager.pressure('cam-1') == manager.SOFT
+    assert len(manager._files) == 1
+
+    manager._add(write_recording(manager, 'cam-1', 'b.mp4', 0.5, 2), 'cam-1', 'recordings', False)
+    manager._evict()
+    assert manager.pressure('cam-1') == manager.OK
+    assert list(manager._files) == [os.path.join(manager.recordings_dir, 'cam-1', 'b.mp4')]
+
+
+def test_uploaded_files_go_first(tmp_path):
+    manager = make_manager(tmp_path, STORAGE_UPLOAD_TO_S3=True)
+    old = write_recording(manager, 'cam-1', 'old.mp4', 1, 1)
+    uploaded = write_recording(manager, 'cam-1', 'uploaded.mp4', 1, 2)
+    manager._add(old, 'cam-1', 'recordings', False)
+    manager._add(uploaded, 'cam-1', 'recordings', True)
+
+    manager._evict()
+
+    assert os.path.exists(old)
+    assert not os.path.exists(uploaded)
+
+
+def test_stale_temp_files_are_removed(tmp_path):
+    manager = make_manager(tmp_path)
+    path = os.path.join(manager.temp_dir, 'upload.mp4')
+    with open(path, 'wb') as f:
+        f.write(b'\0')
+    os.utime(path, (1, 1))
+    manager._add(path, None, 'temp', False)
+
+    manager._evict()
+
+    assert not os.path.exists(path)
+    assert manager._total_bytes == 0
+
+
+@pytest.mark.parametrize('uploaded', [False, True])
+def test_remove_keeps_totals_in_sync(tmp_path, uploaded):
+    manager = make_manager(tmp_path)
+    path = write_recording(manager, 'cam-1', 'a.mp4', 1, 1)
+    manager._add(path, 'cam-1', 'recordings', uploaded)
+
+    manager.remove(path)
+
+    assert manager._total_bytes == 0
+    assert manager._stream_bytes['cam-1'] == 0
+
+
+def test_scan_only_queues_recordings_not_yet_uploaded(tmp_path):
+    manager = make_manager(tmp_path, STORAGE_UPLOAD_TO_S3=True)
+    done = write_recording(manager, 'cam-1', 'done.mp4', 0.1, 1)
+    pending = write_recording(manager, 'cam-1', 'pending.mp4', 0.1, 2)
+    open(done + UPLOADED_SUFFIX, 'w').close()
+
+    restarted = make_manager(tmp_path, STORAGE_UPLOAD_TO_S3=True)
+
+    assert restarted._uploads == [pending]
+    assert restarted._files[done]['uploaded']
+    assert done + UPLOADED_SUFFIX not in restarted._files
+
+
+def test_successful_upload_leaves_a_marker(tmp_path, monkeypatch):
+    from app.utils import storage
+
+    monkeypatch.setattr(storage, 'upload_to_s3', lambda path, object_name=None: f"s3://{object_name}")
+    manager = make_manager(tmp_path, STORAGE_UPLOAD_TO_S3=True)
+    manager.app.app_context = lambda: contextlib.nullcontext()
+    path = write_recording(manager, 'cam-1', 'a.mp4', 0.1, 1)
+    manager._add(path, 'cam-1', 'recordings', False)
+    manager._uploads.append(path)
+
+    manager._upload_pending()
+
+    assert manager._files[path]['uploaded']
+    assert os.path.exists(path + UPLOADED_SUFFIX)
+    manager.remove(path)
+    assert not os.path.exists(path + UPLOADED_SUFFIX)
+
+
+def test_failed_upload_is_requeued(tmp_path, monkeypatch):
+    from app.utils import storage
+
+    def broken(path, object_name=None):
+        raise RuntimeError('network down')
+
+    monkeypatch.setattr(storage, 'upload_to_s3', broken)
+    manager = make_manager(tmp_path, STORAGE_UPLOAD_TO_S3=True)
+    manager.app.app_context = lambda: contextlib.nullcontext()
+    path = write_recording(manager, 'cam-1', 'a.mp4', 0.1, 1)
+    manager._add(path, 'cam-1', 'recordings', False)
+    manager._uploads.append(path)
+
+    manager._upload_pending()
+
+    assert manager._uploads == [path]
+    assert not os.path.exists(path + UPLOADED_SUFFIX)
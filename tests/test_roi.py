@@ -0,0 +1,56 @@
+import numpy as np
+
+from app.utils.roi import crop_regions, offset_matches, to_pixels
+
+
+def make_frame(height=100, width=200):
+    return np.full((height, width, 3), 255, dtype=np.uint8)
+
+
+def test_to_pixels_clips_to_frame():
+    assert to_pixels([0.5, 0.5, 1.0, 1.0], 200, 100) == (100, 50, 200, 100)
+    assert to_pixels([-0.1, 0.0, 0.2, 0.5], 200, 100) == (0, 0, 20, 50)
+
+
+def test_no_regions_is_whole_frame():
+    frame = make_frame()
+    crops = crop_regions(frame, None)
+
+    assert len(crops) == 1
+    crop, offset = crops[0]
+    assert offset == (0, 0)
+    assert crop.shape == frame.shape
+
+
+def test_include_regions_are_cropped_with_offsets():
+    frame = make_frame()
+    crops = crop_regions(frame, {'include': [[0.5, 0.0, 0.5, 0.5], [0.0, 0.5, 0.25, 0.5]]})
+
+    assert [offset for _, offset in crops] == [(100, 0), (0, 50)]
+    assert crops[0][0].shape[:2] == (50, 100)
+    assert crops[1][0].shape[:2] == (50, 50)
+
+
+def test_empty_include_region_is_skipped():
+    crops = crop_regions(make_frame(), {'include': [[1.0, 1.0, 0.5, 0.5]]})
+
+    assert crops == []
+
+
+def test_exclusions_blank_the_crop_but_not_the_frame():
+    frame = make_frame()
+    crops = crop_regions(frame, {'exclude': [[0.0, 0.0, 0.5, 0.5]]})
+
+    crop, _ = crops[0]
+    assert (crop[:50, :100] == 0).all()
+    assert (crop[50:, 100:] == 255).all()
+    assert (frame == 255).all()
+
+
+def test_offset_matches_maps_back_to_frame():
+    matches = [{'x': 5, 'y': 10, 'w': 20, 'h': 30, 'identity': 'nick'}]
+
+    shifted = offset_matches(matches, (100, 50))
+
+    assert shifted == [{'x': 105, 'y': 60, 'w': 20, 'h': 30, 'identity': 'nick'}]
+    assert matches[0]['x'] == 5
@@ -0,0 +1,146 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app import stream_monitor
+from app.api import streams
+from app.stream_monitor import StreamMonitor
+
+
+class FakeApp:
+    config = {
+        'RECOGNITION_BATCH_SIZE': 4,
+        'PREVIEW_MAX_WIDTH': 640,
+        'PREVIEW_MAX_FPS': 5,
+        'PREVIEW_JPEG_QUALITY': 70,
+        'STREAM_CONNECT_WORKERS': 4,
+        'EVIDENCE_MODE': 'video',
+    }
+
+
+class FakeEngine:
+    def find_batch(self, frames, gallery=None):
+        return [[] for _ in frames]
+
+
+class Sources:
+    """Fake captures that take ``delay`` seconds to connect and track concurrent opens."""
+
+    def __init__(self, delay=0.3):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.open = 0
+        self.max_open = 0
+        self.opened = 0
+
+    def open_capture(self, stream_url, config, buffers=4):
+        with self.lock:
+            self.open += 1
+            self.opened += 1
+            self.max_open = max(self.max_open, self.open)
+        time.sleep(self.delay)
+        return FakeCapture(self)
+
+
+class FakeCapture:
+    def __init__(self, sources):
+        self.sources = sources
+        self.released = False
+
+    def isOpened(self):
+        return not self.released
+
+    def read(self):
+        time.sleep(0.01)
+        return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def get(self, prop):
+        return 0.0
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            with self.sources.lock:
+                self.sources.open -= 1
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    sources = Sources()
+    monkeypatch.setattr(stream_monitor, 'open_capture', sources.open_capture)
+    monkeypatch.setattr(stream_monitor, 'get_engine', lambda config: FakeEngine())
+    monkeypatch.setattr(stream_monitor.gallery_store, 'ensure', lambda app: None)
+    yield sources
+    for stream_id in list(streams.active_streams):
+        streams.stop_monitor(stream_id).wait_stopped()
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def make_stream(stream_id='cam-1'):
+    return SimpleNamespace(stream_id=stream_id, stream_url='rtsp://camera/1',
+                           regions=None, evidence_mode=None)
+
+
+def test_monitor_goes_live_and_stops(sources):
+    monitor = StreamMonitor(FakeApp(), 'cam-1', 'rtsp://camera/1')
+    monitor.run()
+    assert monitor.state == monitor.LIVE
+
+    monitor.stop()
+
+    assert monitor.state == monitor.STOPPED
+    assert not monitor.capture_thread.is_alive()
+    assert sources.open == 0
+
+
+def test_stop_during_connect_waits_for_run(sources):
+    monitor = StreamMonitor(FakeApp(), 'cam-1', 'rtsp://camera/1')
+    runner = threading.Thread(target=monitor.run)
+    runner.start()
+    assert wait_for(lambda: monitor.state == monitor.CONNECTING)
+
+    monitor.request_stop()
+    assert not monitor.active
+    monitor.wait_stopped()
+
+    # the capture opened mid-connect has been released, not leaked
+    assert not runner.is_alive()
+    assert sources.open == 0
+    assert monitor.state == monitor.STOPPED
+
+
+def test_restart_during_connect_never_opens_the_source_twice(sources):
+    first = streams.start_monitor(FakeApp(), make_stream())
+    assert wait_for(lambda: first.state == first.CONNECTING)
+
+    second = streams.start_monitor(FakeApp(), make_stream())
+
+    assert first._stop_requested
+    assert streams.active_streams['cam-1'] is second
+    assert wait_for(lambda: second.state == second.LIVE)
+    assert sources.max_open == 1
+    assert first.state == first.STOPPED
+
+
+def test_stop_monitor_flags_synchronously(sources):
+    monitor = streams.start_monitor(FakeApp(), make_stream())
+    assert wait_for(lambda: monitor.state == monitor.LIVE)
+
+    stopped = streams.stop_monitor('cam-1')
+
+    assert stopped is monitor
+    assert 'cam-1' not in streams.active_streams
+    assert monitor._stop_requested and not monitor.active
+    assert wait_for(lambda: monitor.state == monitor.STOPPED)
+    assert sources.open == 0
@@ -0,0 +1,239 @@
+"""Load/stress harness for the stream lifecycle and REST API.
+
+Drives the Flask app in-process with concurrent clients against fake video
+sources, then reports request latency percentiles, leaked threads, captures
+and file descriptors, and memory growth across churn rounds.
+
+    python -m tools.loadtest --streams 20 --rounds 50 --workers 8
+    python -m tools.loadtest --streams 5 --rounds 2000 --readers 16   # long soak
+
+Uses the "loadtest" config (its own SQLite file) and a no-op recognition
+engine unless --engine is given, so it measures lifecycle and API overhead
+rather than model inference.
+"""
+import argparse
+import gc
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from app import create_app, db
+from app.utils import recognition
+import app.stream_monitor as stream_monitor
+
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in producing synthetic frames at a fixed rate."""
+
+    lock = threading.Lock()
+    open_count = 0
+    opened_total = 0
+
+    def __init__(self, stream_url, fps=15, width=640, height=360, open_delay=0.0):
+        time.sleep(open_delay)  # simulate a slow RTSP connect
+        self.interval = 1.0 / fps
+        self.width, self.height = width, height
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self.released = False
+        with FakeCapture.lock:
+            FakeCapture.open_count += 1
+            FakeCapture.opened_total += 1
+
+    def isOpened(self):
+        return not self.released
+
+    def read(self):
+        if self.released:
+            return False, None
+        time.sleep(self.interval)
+        return True, self.frame.copy()
+
+    def get(self, prop):
+        return {
+            cv2.CAP_PROP_FRAME_WIDTH: float(self.width),
+            cv2.CAP_PROP_FRAME_HEIGHT: float(self.height),
+            cv2.CAP_PROP_FPS: 1.0 / self.interval,
+        }.get(prop, 0.0)
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            with FakeCapture.lock:
+                FakeCapture.open_count -= 1
+
+
+class NullEngine:
+    """Recognition engine that never finds a face."""
+
+    name = 'null'
+    embedding_dim = None
+
+    def __init__(self, config):
+        pass
+
+    def find_batch(self, frames, gallery=None):
+        return [[] for _ in frames]
+
+
+def open_fds():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return None
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+
+    def pct(p):
+        return round(samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000, 2)
+
+    return {'n': len(samples), 'p50_ms': pct(50), 'p95_ms': pct(95),
+            'p99_ms': pct(99), 'max_ms': round(samples[-1] * 1000, 2)}
+
+
+class Harness:
+    def __init__(self, app, workers):
+        self.app = app
+        self.workers = workers
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def client(self):
+        if not hasattr(self.local, 'client'):
+            self.local.client = self.app.test_client()
+        return self.local.client
+
+    def call(self, name, method, url, **kwargs):
+        start = time.perf_counter()
+        response = getattr(self.client(), method)(url, **kwargs)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            if response.status_code >= 500:
+                self.errors[name] += 1
+        return response
+
+    def run_concurrently(self, jobs):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(lambda job: job(), jobs))
+
+    def add_streams(self, urls):
+        self.run_concurrently([
+            (lambda u=u: self.call('add_stream', 'post', '/api/streams', json={'stream_url': u}))
+            for u in urls])
+
+    def set_active(self, urls, active):
+        self.run_concurrently([
+            (lambda u=u: self.call(
+                'activate' if active else 'deactivate', 'put', '/api/streams/activate',
+                json={'stream_url': u, 'active': active}))
+            for u in urls])
+
+    def read_api(self, requests):
+        endpoints = [
+            ('list_contacts', '/api/contacts'),
+            ('list_targets', '/api/api/targets'),
+            ('gallery', '/api/gallery'),
+        ]
+        self.run_concurrently([
+            (lambda e=endpoints[i % len(endpoints)]: self.call(e[0], 'get', e[1]))
+            for i in range(requests)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=20, help='deactivate/activate cycles')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent API clients')
+    parser.add_argument('--readers', type=int, default=50, help='read requests per round')
+    parser.add_argument('--fps', type=int, default=15)
+    parser.add_argument('--open-delay', type=float, default=0.0,
+                        help='seconds each fake capture takes to open')
+    parser.add_argument('--engine', default=None, help='real RECOGNITION_ENGINE to use')
+    parser.add_argument('--settle', type=float, default=2.0,
+                        help='seconds to wait for threads to exit before leak checks')
+    args = parser.parse_args()
+
+    recognition.ENGINES[NullEngine.name] = NullEngine
+    stream_monitor.open_capture = lambda url, config, buffers=4: FakeCapture(
+        url, fps=args.fps, open_delay=args.open_delay)
+
+    app = create_app('loadtest')
+    app.config['RECOGNITION_ENGINE'] = args.engine or NullEngine.name
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    harness = Harness(app, args.workers)
+    run_id = uuid.uuid4().hex[:6]
+    urls = [f"fake://{run_id}/{i}" for i in range(args.streams)]
+
+    gc.collect()
+    baseline = {'threads': threading.active_count(), 'fds': open_fds(), 'rss_mb': rss_mb()}
+    tracemalloc.start()
+    first_snapshot = None
+    rss_by_round = []
+
+    harness.add_streams(urls)
+    for round_no in range(args.rounds):
+        harness.set_active(urls, False)
+        harness.read_api(args.readers)
+        harness.set_active(urls, True)
+        harness.read_api(args.readers)
+
+        if round_no == 0:
+            gc.collect()
+            first_snapshot = tracemalloc.take_snapshot()
+        rss_by_round.append(rss_mb())
+
+    harness.set_active(urls, False)
+    time.sleep(args.settle)
+    gc.collect()
+    last_snapshot = tracemalloc.take_snapshot()
+
+    leaked_threads = [
+        t.name for t in threading.enumerate()
+        if t.name.startswith(('capture-', 'process-'))]
+
+    print("\n== Latency ==")
+    for name, samples in sorted(harness.latencies.items()):
+        print(f"{name:>14}: {percentiles(samples)}  5xx={harness.errors[name]}")
+
+    print("\n== Leaks after churn ==")
+    print(f"threads: {baseline['threads']} -> {threading.active_count()} "
+          f"(monitor threads still alive: {len(leaked_threads)})")
+    print(f"captures open: {FakeCapture.open_count} of {FakeCapture.opened_total} opened")
+    print(f"file descriptors: {baseline['fds']} -> {open_fds()}")
+
+    print("\n== Memory ==")
+    if rss_by_round and rss_by_round[0] is not None:
+        print(f"rss: {baseline['rss_mb']:.1f} MB baseline, {rss_by_round[0]:.1f} MB after round 1, "
+              f"{rss_by_round[-1]:.1f} MB after round {len(rss_by_round)}")
+    if first_snapshot is not None:
+        print("top allocation growth since round 1:")
+        for stat in last_snapshot.compare_to(first_snapshot, 'lineno')[:10]:
+            print(f"  {stat}")
+
+
+if __name__ == '__main__':
+    main()